@@ -0,0 +1,56 @@
+"""
+Compares how many time steps per second the large example scenes run at
+with 1, 2, and 4 physics threads.  Each run happens in its own Python
+process, since the number of threads has to be set before any shapes are
+created.  Nothing is drawn, so this measures only the simulation.
+
+Run it from the examples folder:
+
+    python threads_benchmark.py
+"""
+import os
+import random
+import runpy
+import subprocess
+import sys
+
+import pyphysicssandbox
+
+scenes = ['volcano.py', 'lots_of_shapes.py']
+thread_counts = [1, 2, 4]
+warmup_steps = 50
+steps = 200
+
+
+def run_scene(scene, n):
+    # Runs in the child process: the example calls run() at the end,
+    # which is swapped for a headless run that prints its speed
+    def timed_run(*args, **kwargs):
+        pyphysicssandbox.run_headless(warmup_steps)
+        stats = pyphysicssandbox.run_headless(steps)
+        print(stats['steps_per_sec'])
+
+    random.seed(0)
+    pyphysicssandbox.threads(n)
+    pyphysicssandbox.run = timed_run
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), scene))
+
+
+def benchmark():
+    print('%-20s' % 'scene' + ''.join('%12s' % (str(n) + ' threads') for n in thread_counts))
+
+    for scene in scenes:
+        results = []
+        for n in thread_counts:
+            output = subprocess.run([sys.executable, __file__, scene, str(n)],
+                                    capture_output=True, text=True, check=True).stdout
+            results.append(float(output.split()[-1]))
+
+        print('%-20s' % scene + ''.join('%12.1f' % result for result in results))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run_scene(sys.argv[1], int(sys.argv[2]))
+    else:
+        benchmark()
@@ -16,10 +16,20 @@ visible in the simulation and can slow the simulation down if the number of shap
 import pygame
 import pymunk
 import math
+import random
+import time
 
 from pygame import Color
 from pygame import constants
 
+from .font_cache import forget_fonts
+from .font_cache import get_font
+from .frame_scheduler import FrameScheduler
+from .profiler import Profiler
+from .observer import Observer
+from .sprite_cache import SpriteCache
+from .world import World
+
 __docformat__ = "reStructuredText"
 
 
@@ -34,15 +44,26 @@ __all__ = ['window', 'add_observer', 'gravity', 'resistance', 'mouse_clicked',
            'add_collision', 'slip_motor', 'set_margins', 'cosmetic_box',
            'cosmetic_rounded_box', 'cosmetic_ball', 'cosmetic_line',
            'cosmetic_polygon', 'cosmetic_triangle', 'spring',
-           'color'
+           'color', 'run_headless', 'set_timestep', 'set_frame_rate',
+           'set_load_shedding', 'frame_stats', 'profile_stats',
+           'show_profile', 'set_culling', 'set_dirty_rects',
+           'set_sprites', 'set_text_rotation', 'shapes_at',
+           'remove_observer', 'observer_calls', 'on_key', 'balls',
+           'boxes', 'state_arrays', 'group_shapes', 'find_shapes',
+           'shape_of', 'set_collision_events', 'collision_events',
+           'sleep', 'num_sleeping', 'broadphase', 'broadphase_stats',
+           'threads', 'World', 'current_world', 'reset', 'sweep'
            ]
 
 
 pygame.init()
 
-space = pymunk.Space()
-space.gravity = (0.0, 500.0)
-space.damping = 0.95
+# Everything about the simulation belongs to a World.  The functions in
+# this module work on the current world, whose state is kept in these
+# module globals while it's current.  World._install replaces all of
+# them with the current world's values.
+space = None
+next_collision_type = 0
 
 win_title = "Untitled"
 win_width = 500
@@ -50,10 +71,82 @@ win_height = 500
 x_margin = win_width
 y_margin = win_height
 observers = []
+key_observers = {}
+observer_step = 0
+last_observer_calls = 0
 clicked = False
 default_color = Color('black')
 
+physics_dt = 1 / 50.0
+physics_substeps = 1
+frame_rate = 50
+interpolate = False
+max_frame_time = 0.25
+load_shedding = True
+max_skipped_frames = 10
+scheduler = None
+profiler = None
+profile_overlay = False
+
+cull_interval = 1
+cull_hysteresis = 1
+cull_countdown = 0
+
 shapes = {}
+unqueried_shapes = {}
+wrapping_shapes = {}
+background_shapes = {}
+foreground_shapes = {}
+background = None
+dirty_rects = False
+sprite_cache = None
+drawn_rects = None
+out_of_bounds = {}
+previous_state = {}
+shapes_version = 0
+shapes_by_kind = {}
+shapes_by_mobility = {}
+shapes_by_group = {}
+shapes_by_tag = {}
+shape_categories = {}
+category_pairs = []
+category_handler = None
+collision_handlers = []
+collision_recorder = None
+broadphase_tuner = None
+state_snapshot = None
+
+_world = None
+World()._install()
+
+
+def current_world():
+    """Returns the world that the sandbox functions are working on.  A world
+    holds everything about one simulation: its shapes, observers, window
+    settings, and physics engine.  Make another world current with
+    world.activate(), or temporarily with a with statement:
+
+        other = World()
+
+        with other:
+            ball((100, 100), 25)
+            run_headless(100)
+
+    Shapes belong to the world that was current when they were created, and
+    should only be changed while their world is current.  Worlds can be
+    pickled, for example to send them to other processes, as long as their
+    observers and collision handlers are ordinary functions.
+
+    :rtype: World
+    """
+    return _world
+
+
+def reset():
+    """Starts the current world over with no shapes and the default
+    settings, for running another simulation in the same program.
+    """
+    _world.reset()
 
 
 def window(title, width, height):
@@ -81,7 +174,7 @@ def window(title, width, height):
     y_margin = win_height
 
 
-def add_observer(hook):
+def add_observer(hook, every=1, phase=0, priority=0):
     """Adds an observer function to the simulation.  Every observer
     function is called once per time step of the simulation (roughly
     50 times a second).  The function should be defined like this:
@@ -99,13 +192,97 @@ def add_observer(hook):
             if constants.K_UP in keys:
                 # do something based on the up arrow being pressed
 
+    Observers that do a lot of work can be called less often.  For
+    example, every=5 calls the observer on every fifth time step.  The
+    phase picks which of those time steps, from 0 to every-1, so that
+    several slow observers can take turns instead of all running on the
+    same time step.  Keys pressed on time steps the observer skips are
+    not passed to it, so use on_key to react to keys.
+
+    Observers with a higher priority are called before observers with
+    a lower priority.  Observers with the same priority are called in
+    the order they were added.
+
+    :param hook: the observer function
+    :type hook: function
+    :param every: how many time steps between calls (defaults to 1)
+    :type every: int
+    :param phase: which time step out of every to call the observer on (defaults to 0)
+    :type phase: int
+    :param priority: the priority of the observer (defaults to 0)
+    :type priority: int
+
+    """
+    if type(every) != int or every < 1:
+        print("Every value must be a positive integer")
+        return
+
+    if type(phase) != int or phase < 0 or phase >= every:
+        print("Phase value must be an integer from 0 to every-1")
+        return
+
+    if type(priority) != int and type(priority) != float:
+        print("Priority value must be a number")
+        return
+
+    observers.append(Observer(hook, every, phase, priority))
+    observers.sort(key=Observer.sort_key)
+
+
+def on_key(key, hook, priority=0):
+    """Adds a function that is called only on time steps when the given key
+    is pressed, e.g.:
+
+        def jump(keys):
+            # do something when the space bar is pressed
+
+        on_key(constants.K_SPACE, jump)
+
+    The function is passed the list of keys pressed this step, just like an
+    observer function.  Use remove_observer to stop calling it.
+
+    :param key: the key to watch for, e.g. constants.K_SPACE
+    :type key: int
+    :param hook: the function to call
+    :type hook: function
+    :param priority: the priority of the function, as with add_observer (defaults to 0)
+    :type priority: int
+
+    """
+    if type(priority) != int and type(priority) != float:
+        print("Priority value must be a number")
+        return
+
+    key_observers.setdefault(key, []).append(Observer(hook, priority=priority, key=key))
+
+
+def remove_observer(hook):
+    """Removes an observer function that was added with add_observer or
+    on_key, so it is no longer called.
+
     :param hook: the observer function
     :type hook: function
 
     """
     global observers
 
-    observers.append(hook)
+    observers = [observer for observer in observers if observer.hook != hook]
+
+    for key in list(key_observers):
+        key_observers[key] = [observer for observer in key_observers[key] if observer.hook != hook]
+
+        if not key_observers[key]:
+            del key_observers[key]
+
+
+def observer_calls():
+    """Returns how many observer functions were called in the most recent
+    time step.  Useful for seeing how much work is done each time step
+    outside of the physics engine.
+
+    :rtype: int
+    """
+    return last_observer_calls
 
 
 def set_margins(x, y):
@@ -124,6 +301,438 @@ def set_margins(x, y):
     y_margin = y
 
 
+def set_timestep(dt, substeps=1, interpolation=True):
+    """Sets how much simulated time passes in each physics time step, independently
+    of how often the window is drawn.  Smaller time steps make stiff springs and fast
+    moving shapes behave better without slowing down the simulation on screen, since
+    the sandbox runs as many time steps as needed to keep up with real time.
+
+    Each time step may also be broken up into several smaller substeps for the
+    physics engine.  Observer functions are called once per time step, not once
+    per substep.
+
+    When interpolation is on, shapes are drawn between where they were in the last
+    two time steps so that movement looks smooth even when the time step does not
+    match the frame rate.
+
+    :param dt: The number of seconds of simulated time in each time step (defaults to 1/50)
+    :type dt: float
+    :param substeps: How many pieces to break each time step into
+    :type substeps: int
+    :param interpolation: Should shapes be drawn between time steps or not
+    :type interpolation: bool
+    """
+    global physics_dt
+    global physics_substeps
+    global interpolate
+
+    if type(dt) == int:
+        dt = float(dt)
+
+    if type(dt) != float or dt <= 0:
+        print("Time step value must be a positive number")
+        return
+
+    if type(substeps) != int or substeps < 1:
+        print("Substeps value must be a positive integer")
+        return
+
+    if type(interpolation) != bool:
+        print("Interpolation value must be True or False")
+        return
+
+    physics_dt = dt
+    physics_substeps = substeps
+    interpolate = interpolation
+
+
+def set_frame_rate(fps):
+    """Sets how many times per second the window is drawn.  This defaults to 50.
+    The physics time step is set separately with set_timestep.  If drawing falls
+    behind, frames are skipped rather than slowing down the simulation.
+
+    :param fps: The number of frames to draw per second
+    :type fps: int
+    """
+    global frame_rate
+
+    if type(fps) == int and fps > 0:
+        frame_rate = fps
+    else:
+        print("Frame rate value must be a positive integer")
+
+
+def set_load_shedding(enabled, max_skipped=10):
+    """Sets whether the sandbox may leave work out of frames when the
+    simulation is falling behind real time.  This is on by default.  A slow
+    frame just runs more physics time steps, so nothing is skipped until
+    frames would keep getting longer without ever catching up.  Then the
+    sandbox first skips drawing, then skips removing off screen shapes and
+    wrapping, and only skips physics time steps if a time step takes longer
+    to run than the time it simulates.  Without this a slow scene goes into
+    slow motion.
+
+    Use frame_stats() to see what was skipped and why.
+
+    :param enabled: Should work be skipped when frames run late or not
+    :type enabled: bool
+    :param max_skipped: The most frames in a row that may skip drawing
+    :type max_skipped: int
+    """
+    global load_shedding
+    global max_skipped_frames
+
+    if type(enabled) != bool:
+        print("Load shedding value must be True or False")
+        return
+
+    if type(max_skipped) != int or max_skipped < 0:
+        print("Max skipped value must be a non-negative integer")
+        return
+
+    load_shedding = enabled
+    max_skipped_frames = max_skipped
+
+
+def frame_stats():
+    """Returns statistics about the frames drawn by the last call to run().
+    The result is a dictionary:
+
+        frames: the number of frames run
+        budget: the number of seconds each frame is allowed to take
+        skipped: how many times drawing ('draw'), removing off screen shapes ('cull'),
+                 and wrapping ('wrap') were skipped, and how many physics time steps
+                 were dropped ('physics')
+        reasons: how many times each phase was skipped for each reason
+        costs: the average number of seconds each phase takes
+
+    Returns None if run() has not been called yet.
+
+    :rtype: dict
+    """
+    if scheduler is None:
+        return None
+
+    return scheduler.stats()
+
+
+def profile_stats():
+    """Returns how long each part of the main loop has been taking, so you can
+    tell whether a slow simulation is spending its time in observer functions,
+    drawing, or physics.  The result is a dictionary with an entry for each part:
+
+        events: reading the keyboard and mouse
+        observers: calling observer functions, once per time step
+        cull: removing shapes that are far off screen
+        wrap: wrapping shapes around the edges of the window
+        draw: drawing the shapes
+        physics: running the physics engine, once per time step
+        flip: showing the drawn frame on the screen
+        frame: the whole frame
+
+    Each entry is a dictionary with the 50th, 95th, and 99th percentile times in
+    seconds ('p50', 'p95', 'p99') over the most recent samples, and how many samples
+    there were ('count').  Times are kept for the most recent run() or run_headless().
+
+    :rtype: dict
+    """
+    return profiler.stats()
+
+
+def show_profile(enabled):
+    """Sets whether the percentile times from profile_stats() are drawn in the
+    upper left corner of the window while the simulation runs.
+
+    :param enabled: Should the times be shown or not
+    :type enabled: bool
+    """
+    global profile_overlay
+
+    if type(enabled) == bool:
+        profile_overlay = enabled
+    else:
+        print("Show profile value must be True or False")
+
+
+def broadphase(mode='auto', dim=None, count=None):
+    """Chooses how the physics engine finds shapes that might be touching.
+    'tree' is the default and works well for most scenes.  'hash' uses a
+    spatial hash, which can be much faster for lots of shapes that are all
+    about the same size.  'auto' uses the spatial hash once there are enough
+    shapes of similar sizes.
+
+    The hash's cell size and number of buckets are picked from the size and
+    number of the moving shapes, and picked again if the number of shapes
+    changes a lot, unless dim and count are given.  Once the spatial hash is
+    in use the physics engine can't switch back to the tree.
+
+    :param mode: 'auto', 'tree', or 'hash'
+    :type mode: str
+    :param dim: the size of each cell of the spatial hash
+    :type dim: float
+    :param count: the number of buckets in the spatial hash
+    :type count: int
+    """
+    global broadphase_tuner
+
+    if mode not in ('auto', 'tree', 'hash'):
+        print("Broadphase mode must be 'auto', 'tree', or 'hash'")
+        return
+
+    if dim is not None and (type(dim) not in (int, float) or dim <= 0):
+        print("Dim must be a number greater than 0")
+        return
+
+    if count is not None and (type(count) != int or count <= 0):
+        print("Count must be an int greater than 0")
+        return
+
+    using_hash = broadphase_tuner is not None and broadphase_tuner.using_hash
+
+    if mode == 'tree':
+        if using_hash:
+            print("The physics engine can't switch back to the tree once the spatial hash is used")
+        else:
+            broadphase_tuner = None
+
+        return
+
+    from .spatial_index import BroadphaseTuner
+
+    broadphase_tuner = BroadphaseTuner(mode, dim, count)
+    broadphase_tuner.using_hash = using_hash
+    broadphase_tuner.update(space, len(shapes))
+
+
+def broadphase_stats():
+    """Returns information about how the physics engine is finding shapes that
+    might be touching, for comparing broadphase choices.  The dictionary has
+    the broadphase mode, the index in use ('tree' or 'hash'), the hash's cell
+    size and bucket count, the number of shapes in the physics engine, and how
+    many pairs of shapes were touching after the last time step.
+
+    :rtype: dict
+    """
+    from .spatial_index import touching_pairs
+
+    if broadphase_tuner is None:
+        return {'mode': 'tree', 'index': 'tree', 'dim': None, 'count': None,
+                'shapes': len(space.shapes), 'pairs': touching_pairs(space)}
+
+    return broadphase_tuner.stats(space)
+
+
+def threads(n):
+    """Sets how many threads the physics engine uses for each time step.  More
+    than one thread can make big scenes with thousands of touching shapes
+    faster on computers with several cores, but makes little difference to
+    small scenes.  The physics engine currently uses at most 2 threads, and
+    threads aren't available on Windows, where the sandbox keeps using one.
+
+    This must be called before any shapes are created.
+
+    :param n: the number of threads to use
+    :type n: int
+    """
+    global space
+    global category_handler
+
+    if type(n) != int or n < 1:
+        print("Threads must be an int that is 1 or more")
+        return
+
+    if shapes:
+        print("Threads must be set before any shapes are created")
+        return
+
+    if n == 1:
+        new_space = pymunk.Space()
+    else:
+        try:
+            new_space = pymunk.Space(threaded=True)
+        except TypeError:
+            # Older versions of pymunk have no threaded solver
+            new_space = pymunk.Space()
+
+        if not getattr(new_space, 'threaded', False):
+            print("Threads aren't available on this computer, using one thread")
+
+        new_space.threads = n
+
+    for setting in ('gravity', 'damping', 'iterations', 'idle_speed_threshold',
+                    'sleep_time_threshold', 'collision_slop', 'collision_bias',
+                    'collision_persistence'):
+        setattr(new_space, setting, getattr(space, setting))
+
+    if broadphase_tuner is not None and broadphase_tuner.using_hash:
+        new_space.use_spatial_hash(broadphase_tuner.dim, broadphase_tuner.count)
+
+    space = new_space
+
+    if category_handler is not None:
+        category_handler = None
+        _use_category_handler()
+
+
+def set_culling(interval=1, hysteresis=1):
+    """Sets how often the sandbox looks for shapes that have gone too far outside
+    the window (see set_margins) and removes them from the simulation.  By default
+    this is checked every frame.  Checking less often saves time in simulations
+    with many shapes.
+
+    The hysteresis is how many checks in a row a shape must be found outside the
+    margins before it is removed, so shapes that only briefly leave the margins
+    and come right back are not removed.
+
+    :param interval: How many frames between checks
+    :type interval: int
+    :param hysteresis: How many checks in a row a shape must be outside before removal
+    :type hysteresis: int
+    """
+    global cull_interval
+    global cull_hysteresis
+    global cull_countdown
+
+    if type(interval) != int or interval < 1:
+        print("Culling interval value must be a positive integer")
+        return
+
+    if type(hysteresis) != int or hysteresis < 1:
+        print("Culling hysteresis value must be a positive integer")
+        return
+
+    cull_interval = interval
+    cull_hysteresis = hysteresis
+    cull_countdown = 0
+
+
+def set_dirty_rects(enabled):
+    """Sets whether only the parts of the window that changed are redrawn each
+    frame.  This is off by default.  When it is on, the sandbox remembers where
+    each moving shape was drawn, erases just those areas, and updates only those
+    areas of the window.  This is faster for large windows with only a few moving
+    shapes, but slower when there are many moving shapes.
+
+    :param enabled: Should only changed areas be redrawn or not
+    :type enabled: bool
+    """
+    global dirty_rects
+    global drawn_rects
+
+    if type(enabled) == bool:
+        dirty_rects = enabled
+        drawn_rects = None
+    else:
+        print("Dirty rects value must be True or False")
+
+
+def set_sprites(enabled, memory=16, angle_step=5):
+    """Sets whether moving balls and boxes are drawn from pre-drawn images
+    instead of being drawn from scratch each frame.  This is off by default.
+    With thousands of balls or boxes this is much faster.
+
+    An image is drawn the first time a ball or box of a particular size and
+    color is seen at a particular angle, and then reused.  Angles are rounded
+    to the nearest angle_step degrees.  When the images take up more than the
+    given number of megabytes of memory, the least recently used are thrown away.
+
+    :param enabled: Should balls and boxes be drawn from images or not
+    :type enabled: bool
+    :param memory: The most memory to use for images, in megabytes
+    :type memory: int
+    :param angle_step: How many degrees to round angles to
+    :type angle_step: int
+    """
+    global sprite_cache
+
+    if type(enabled) != bool:
+        print("Sprites value must be True or False")
+        return
+
+    if (type(memory) != int and type(memory) != float) or memory <= 0:
+        print("Memory value must be a positive number")
+        return
+
+    if (type(angle_step) != int and type(angle_step) != float) or angle_step <= 0:
+        print("Angle step value must be a positive number")
+        return
+
+    if enabled:
+        sprite_cache = SpriteCache(int(memory * 1024 * 1024), angle_step)
+    else:
+        sprite_cache = None
+
+
+def set_text_rotation(step=1, cache_size=32):
+    """Sets how text shapes reuse their rotated images.  Rotating text is slow, so
+    each text shape keeps the images for the most recent angles it was drawn at
+    and reuses them.  Angles are rounded to the nearest step degrees, so a larger
+    step means more reuse but less smooth rotation.
+
+    :param step: How many degrees to round angles to (defaults to 1)
+    :type step: int
+    :param cache_size: How many rotated images each text shape keeps (defaults to 32)
+    :type cache_size: int
+    """
+    from .text_shape import Text
+
+    if (type(step) != int and type(step) != float) or step <= 0:
+        print("Step value must be a positive number")
+        return
+
+    if type(cache_size) != int or cache_size < 1:
+        print("Cache size value must be a positive integer")
+        return
+
+    Text.rotation_step = step
+    Text.rotation_cache_size = cache_size
+
+
+def sleep(enabled, idle_speed=0, time=0.5):
+    """Lets shapes that have stopped moving fall asleep.  Sleeping shapes are
+    skipped by the physics engine until something hits them, which makes piles
+    of shapes that have settled much faster to simulate.  Sleeping shapes are
+    also not removed for being off screen until they wake up.
+
+    :param enabled: True to let shapes sleep, False to keep them all awake
+    :type enabled: bool
+    :param idle_speed: shapes moving slower than this are idle, 0 picks a speed based on gravity
+    :type idle_speed: float
+    :param time: how many seconds a shape must be idle before it falls asleep
+    :type time: float
+    """
+    if type(enabled) != bool:
+        print("Sleep value must be True or False")
+        return
+
+    if type(idle_speed) not in (int, float) or idle_speed < 0:
+        print("Idle speed must be a number that is 0 or more")
+        return
+
+    if type(time) not in (int, float) or time <= 0:
+        print("Time must be a number greater than 0")
+        return
+
+    if enabled:
+        space.idle_speed_threshold = idle_speed
+        space.sleep_time_threshold = time
+    else:
+        space.sleep_time_threshold = float('inf')
+
+        # Shapes already asleep would otherwise stay asleep
+        for body in space.bodies:
+            if body.is_sleeping:
+                body.activate()
+
+
+def num_sleeping():
+    """Returns the number of shapes' bodies that are asleep.
+
+    :rtype int
+    """
+    return sum(1 for body in space.bodies if body.is_sleeping)
+
+
 def gravity(x, y):
     """Sets the direction and amount of gravity used by the simulation.
     Positive x is to the right, positive y is downward.  This value can
@@ -243,11 +852,59 @@ def _ball(p, radius, mass, static=False, cosmetic=False):
 
     result = Ball(space, p[0], p[1], radius, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
 
+def balls(positions, radii, masses=None, colors=None):
+    """Creates many balls that react to gravity at once.  The balls are
+    added to the physics engine and the sandbox's lists of shapes in one
+    go, instead of one at a time as calling ball for each one does.
+
+    Any of radii, masses, and colors may be a single value used for
+    every ball, or a sequence with one value per ball.  NumPy arrays
+    may be used for positions, radii, and masses.
+
+    :param positions: The center points of the balls
+    :type positions: sequence of (int, int)
+    :param radii: The radius of the balls
+    :type radii: int or sequence of int
+    :param masses: The masses of the balls (defaults to their area)
+    :type masses: int or sequence of int
+    :param colors: The colors of the balls (defaults to the current default color)
+    :type colors: Color or sequence of Color
+    :rtype: shape group
+
+    """
+    from .ball_shape import Ball
+
+    positions = list(positions)
+    count = len(positions)
+    radii = _per_shape('radii', radii, count)
+    masses = _per_shape('masses', masses, count)
+    colors = _per_shape_color(colors, count)
+
+    if radii is None or masses is None or colors is None:
+        return None
+
+    result = []
+    for i in range(count):
+        radius = float(radii[i])
+        mass = masses[i]
+
+        if mass is None or mass == -1:
+            mass = math.pi*radius*radius
+
+        ball = Ball(space, float(positions[i][0]), float(positions[i][1]), radius, float(mass), False,
+                    add_to_space=False)
+        # The colors were already checked, and the balls aren't drawn yet
+        ball._color = colors[i]
+        result.append(ball)
+
+    return _add_shapes(result)
+
+
 def static_box(p, width, height):
     """Creates a box that remains fixed in place.
 
@@ -307,11 +964,66 @@ def _box(p, width, height, mass, static, radius=0, cosmetic=False):
 
     result = Box(space, x, y, width, height, radius, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
 
+def boxes(positions, widths, heights, masses=None, colors=None):
+    """Creates many boxes that react to gravity at once.  The boxes are
+    added to the physics engine and the sandbox's lists of shapes in one
+    go, instead of one at a time as calling box for each one does.
+
+    Any of widths, heights, masses, and colors may be a single value
+    used for every box, or a sequence with one value per box.  NumPy
+    arrays may be used for positions, widths, heights, and masses.
+
+    :param positions: The upper left corners of the boxes
+    :type positions: sequence of (int, int)
+    :param widths: The widths of the boxes
+    :type widths: int or sequence of int
+    :param heights: The heights of the boxes
+    :type heights: int or sequence of int
+    :param masses: The masses of the boxes (defaults to their area)
+    :type masses: int or sequence of int
+    :param colors: The colors of the boxes (defaults to the current default color)
+    :type colors: Color or sequence of Color
+    :rtype: shape group
+
+    """
+    from .box_shape import Box
+
+    positions = list(positions)
+    count = len(positions)
+    widths = _per_shape('widths', widths, count)
+    heights = _per_shape('heights', heights, count)
+    masses = _per_shape('masses', masses, count)
+    colors = _per_shape_color(colors, count)
+
+    if widths is None or heights is None or masses is None or colors is None:
+        return None
+
+    result = []
+    for i in range(count):
+        width = float(widths[i])
+        height = float(heights[i])
+        mass = masses[i]
+
+        if mass is None or mass == -1:
+            mass = width * height
+
+        # Polygons expect x,y to be the center point
+        x = float(positions[i][0]) + width / 2
+        y = float(positions[i][1]) + height / 2
+
+        box = Box(space, x, y, width, height, 0, float(mass), False, add_to_space=False)
+        # The colors were already checked, and the boxes aren't drawn yet
+        box._color = colors[i]
+        result.append(box)
+
+    return _add_shapes(result)
+
+
 def static_rounded_box(p, width, height, radius):
     """Creates a box with rounded corners that remains fixed in place.
 
@@ -413,7 +1125,7 @@ def _polygon(vertices, mass, static, cosmetic=False):
     vertices = [(v[0] - x, v[1] - y) for v in vertices]
     result = Poly(space, x, y, vertices, 0, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -482,7 +1194,7 @@ def _triangle(p1, p2, p3, mass, static, cosmetic=False):
 
     result = Poly(space, x, y, vertices, 0, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -539,7 +1251,7 @@ def _text(p, caption, mass, static, cosmetic=False):
 
     result = Text(space, p[0], p[1], caption, "Arial", 12, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -606,7 +1318,7 @@ def _text_with_font(p, caption, font, size, mass, static, cosmetic=False):
 
     result = Text(space, p[0], p[1], caption, font, size, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -666,7 +1378,7 @@ def _line(p1, p2, thickness, mass, static, cosmetic=False):
 
     result = Line(space, p1, p2, thickness, mass, static, cosmetic)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -685,7 +1397,7 @@ def pivot(p):
 
     result = Pivot(space, p[0], p[1])
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -706,7 +1418,7 @@ def gear(shape1, shape2):
 
     result = Gear(space, shape1, shape2)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -728,7 +1440,7 @@ def motor(shape1, speed=5):
 
     result = Motor(space, shape1, speed)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -753,7 +1465,7 @@ def pin(p1, shape1, p2, shape2):
 
     result = Pin(space, p1, shape1, p2, shape2)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -787,7 +1499,7 @@ def spring(p1, shape1, p2, shape2, length, stiffness, damping):
 
     result = Spring(space, p1, shape1, p2, shape2, length, stiffness, damping)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -819,7 +1531,7 @@ def slip_motor(shape1, shape2, rest_angle, stiffness, damping, slip_angle, speed
 
     result = SlipMotor(space, shape1, shape2, rest_angle, stiffness, damping, slip_angle, speed)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
@@ -848,11 +1560,310 @@ def rotary_spring(shape1, shape2, angle, stiffness, damping):
 
     result = RotarySpring(space, shape1, shape2, angle, stiffness, damping)
     result.color = default_color
-    shapes[result.collision_type] = result
+    _add_shape(result)
 
     return result
 
 
+def _next_collision_type():
+    # Every shape in a world has its own collision type, which is also
+    # its key in shapes
+    global next_collision_type
+
+    next_collision_type += 1
+    return next_collision_type
+
+
+def _add_shape(shape):
+    global shapes_version
+
+    shapes[shape.collision_type] = shape
+    shapes_version += 1
+    _index_shape(shape)
+
+    # Shapes that never move are drawn once onto a background
+    # that is reused each frame
+    if shape._in_background():
+        background_shapes[shape.collision_type] = shape
+        _invalidate_background()
+    else:
+        foreground_shapes[shape.collision_type] = shape
+
+    # Shapes without a collision shape of their own can't be found by
+    # space queries, so culling has to check them one by one
+    if shape.body is None or not shape.body.shapes:
+        unqueried_shapes[shape.collision_type] = shape
+
+    _update_wrapping(shape)
+
+
+def _add_shapes(new_shapes):
+    # Like _add_shape for many shapes at once, with one call into the
+    # physics engine and one update of each index
+    global shapes_version
+
+    from .shape_group import ShapeGroup
+
+    items = []
+    collision_shapes = []
+    added = {}
+    background_added = {}
+    foreground_added = {}
+    unqueried_added = {}
+
+    for shape in new_shapes:
+        if shape.body is not None:
+            items.append(shape.body)
+
+        own_shapes = shape._collision_shapes()
+        collision_shapes.extend(own_shapes)
+        added[shape.collision_type] = shape
+
+        if not own_shapes:
+            unqueried_added[shape.collision_type] = shape
+
+        if shape._in_background():
+            background_added[shape.collision_type] = shape
+        else:
+            foreground_added[shape.collision_type] = shape
+
+    # Inserting shapes that are lined up in order (a row of balls,
+    # for example) builds a very lopsided collision tree and takes
+    # far longer than inserting them in a mixed up order.  The seed
+    # is fixed so the same scene always behaves the same way.
+    random.Random(0).shuffle(collision_shapes)
+    items.extend(collision_shapes)
+    space.add(*items)
+
+    shapes.update(added)
+    shapes_version += 1
+    _index_shapes(new_shapes)
+
+    foreground_shapes.update(foreground_added)
+    if background_added:
+        background_shapes.update(background_added)
+        _invalidate_background()
+
+    unqueried_shapes.update(unqueried_added)
+
+    for shape in new_shapes:
+        _update_wrapping(shape)
+
+    return ShapeGroup(new_shapes)
+
+
+def _per_shape(name, value, count):
+    # Returns a list with one value per shape, repeating a single value
+    if value is None or not hasattr(value, '__len__'):
+        return [value] * count
+
+    if len(value) != count:
+        print(name + " must be a single value or have one value for each shape")
+        return None
+
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+
+    return list(value)
+
+
+def _per_shape_vector(name, value, count):
+    # Like _per_shape, but for (x, y) values
+    if len(value) == 2 and not hasattr(value[0], '__len__'):
+        return [(value[0], value[1])] * count
+
+    if len(value) != count:
+        print(name + " must be an (x, y) tuple or have one (x, y) tuple for each shape")
+        return None
+
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+
+    return [(v[0], v[1]) for v in value]
+
+
+def _per_shape_color(value, count):
+    if value is None:
+        return [default_color] * count
+
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+
+    # A single color may be a Color, a color name, or an (r, g, b) tuple
+    if type(value) == Color or type(value) == str or \
+            (len(value) in (3, 4) and not hasattr(value[0], '__len__') and type(value[0]) != str):
+        return [_to_color(value)] * count
+
+    if len(value) != count:
+        print("colors must be a single color or have one color for each shape")
+        return None
+
+    return [_to_color(c) for c in value]
+
+
+def _to_color(value):
+    if type(value) == Color:
+        return value
+
+    if type(value) == str:
+        return Color(value)
+
+    # NumPy rows hold NumPy numbers, which Color doesn't take
+    return Color(*[int(channel) for channel in value])
+
+
+def _remove_shape(shape):
+    global shapes_version
+
+    del shapes[shape.collision_type]
+    shapes_version += 1
+    _unindex_shape(shape)
+    unqueried_shapes.pop(shape.collision_type, None)
+    wrapping_shapes.pop(shape.collision_type, None)
+    foreground_shapes.pop(shape.collision_type, None)
+
+    if background_shapes.pop(shape.collision_type, None):
+        _invalidate_background()
+    out_of_bounds.pop(shape.collision_type, None)
+
+
+def _index_shape(shape):
+    # Secondary indexes so find_shapes only looks at shapes that
+    # might match instead of every shape in the simulation
+    _index(shapes_by_kind, type(shape), shape)
+    _index(shapes_by_mobility, shape._mobility(), shape)
+
+    shape._indexed_group = shape._filter_group()
+    if shape._indexed_group is not None:
+        _index(shapes_by_group, shape._indexed_group, shape)
+
+    for tag in shape._tags:
+        _index(shapes_by_tag, tag, shape)
+
+
+def _index_shapes(new_shapes):
+    # Shapes created together are usually all the same kind, so each
+    # index entry is looked up once for the whole batch
+    by_kind = {}
+    by_mobility = {}
+    by_group = {}
+
+    for shape in new_shapes:
+        collision_type = shape.collision_type
+        _batch(by_kind, type(shape))[collision_type] = shape
+        _batch(by_mobility, shape._mobility())[collision_type] = shape
+
+        shape._indexed_group = shape._filter_group()
+        if shape._indexed_group is not None:
+            _batch(by_group, shape._indexed_group)[collision_type] = shape
+
+        for tag in shape._tags:
+            _index(shapes_by_tag, tag, shape)
+
+    for index, batches in ((shapes_by_kind, by_kind), (shapes_by_mobility, by_mobility),
+                           (shapes_by_group, by_group)):
+        for key, entries in batches.items():
+            index.setdefault(key, {}).update(entries)
+
+
+def _batch(batches, key):
+    entries = batches.get(key)
+
+    if entries is None:
+        entries = {}
+        batches[key] = entries
+
+    return entries
+
+
+def _unindex_shape(shape):
+    _unindex(shapes_by_kind, type(shape), shape)
+    _unindex(shapes_by_mobility, shape._mobility(), shape)
+
+    if shape._indexed_group is not None:
+        _unindex(shapes_by_group, shape._indexed_group, shape)
+
+    for tag in shape._tags:
+        _unindex(shapes_by_tag, tag, shape)
+
+
+def _index(index, key, shape):
+    entries = index.get(key)
+
+    if entries is None:
+        entries = {}
+        index[key] = entries
+
+    entries[shape.collision_type] = shape
+
+
+def _unindex(index, key, shape):
+    entries = index.get(key)
+
+    if entries is not None:
+        entries.pop(shape.collision_type, None)
+
+        if not entries:
+            del index[key]
+
+
+def _in_own_world(shape, function, *args):
+    # Collision types are only unique within a world, so a shape from
+    # another world is looked up with its own world made current
+    with shape._world:
+        return function(shape, *args)
+
+
+def _regroup(shape):
+    # Called when a shape's collision group changes
+    if shape._world is not _world:
+        return _in_own_world(shape, _regroup)
+
+    if shapes.get(shape.collision_type) is not shape:
+        return
+
+    if shape._indexed_group is not None:
+        _unindex(shapes_by_group, shape._indexed_group, shape)
+
+    shape._indexed_group = shape._filter_group()
+    if shape._indexed_group is not None:
+        _index(shapes_by_group, shape._indexed_group, shape)
+
+
+def _retag(shape, tag, added):
+    # Called when a tag is added to or removed from a shape
+    if shape._world is not _world:
+        return _in_own_world(shape, _retag, tag, added)
+
+    if shapes.get(shape.collision_type) is not shape:
+        return
+
+    if added:
+        _index(shapes_by_tag, tag, shape)
+    else:
+        _unindex(shapes_by_tag, tag, shape)
+
+
+def _invalidate_background():
+    global background
+
+    background = None
+
+
+def _update_wrapping(shape):
+    # Only active shapes that wrap are looked at by the wrap pass
+    if shape._world is not _world:
+        return _in_own_world(shape, _update_wrapping)
+
+    if shapes.get(shape.collision_type) is not shape:
+        return
+
+    if shape.wrap_x or shape.wrap_y:
+        wrapping_shapes[shape.collision_type] = shape
+    else:
+        wrapping_shapes.pop(shape.collision_type, None)
+
+
 def num_shapes():
     """Returns the number of active shapes in the simulation.
 
@@ -861,6 +1872,210 @@ def num_shapes():
     return len(shapes)
 
 
+def shapes_at(points):
+    """Finds the shapes under each of the given points, for example to see which
+    shapes are under the mouse pointer.  This is much faster than calling inside()
+    on every shape.  Only active shapes are found.  Joints other than pivots are
+    not included.
+
+    Returns a list with one entry per point.  Each entry is a list of the shapes
+    under that point.
+
+    :param points: the points to check
+    :type points: [(int, int), (int, int), ...]
+    :rtype: [[shape, ...], ...]
+    """
+    results = []
+
+    for p in points:
+        found = []
+
+        for info in space.point_query(p, 0, pymunk.ShapeFilter()):
+            shape = shapes.get(info.shape.collision_type)
+
+            if shape is not None and shape not in found:
+                found.append(shape)
+
+        # Cosmetic shapes and pivots aren't known to the physics engine
+        for collision_type, shape in unqueried_shapes.items():
+            if shape.inside(p):
+                found.append(shape)
+
+        results.append(found)
+
+    return results
+
+
+def find_shapes(kind=None, mobility=None, group=None, tag=None):
+    """Returns a list of the active shapes that match all of the given
+    conditions.  Conditions that are left out match every shape.  This
+    only looks at shapes that might match, so it stays fast even with a
+    lot of shapes in the simulation.
+
+    :param kind: the kind of shape, such as 'ball', 'box', 'poly', 'text', 'line', 'pivot', or 'pin'.
+        Text shapes are also boxes, and slip motors are also motors.
+    :type kind: str
+    :param mobility: 'static', 'dynamic', or 'cosmetic'
+    :type mobility: str
+    :param group: the collision group set with the group property
+    :type group: int
+    :param tag: a tag added with add_tag
+    :type tag: str
+    :rtype: [shape, ...]
+    """
+    if mobility is not None and mobility not in ('static', 'dynamic', 'cosmetic'):
+        print("Mobility must be 'static', 'dynamic', or 'cosmetic'")
+        return []
+
+    conditions = []
+
+    if kind is not None:
+        conditions.append(_kind_indexes(kind))
+
+    if mobility is not None:
+        conditions.append([shapes_by_mobility.get(mobility, {})])
+
+    if group is not None:
+        conditions.append([shapes_by_group.get(group, {})])
+
+    if tag is not None:
+        conditions.append([shapes_by_tag.get(tag, {})])
+
+    if not conditions:
+        return list(shapes.values())
+
+    # Go through the condition with the fewest shapes and check
+    # the others by looking up each shape in their indexes
+    conditions.sort(key=lambda indexes: sum(len(entries) for entries in indexes))
+    others = conditions[1:]
+
+    result = []
+    for entries in conditions[0]:
+        for collision_type, shape in entries.items():
+            if all(any(collision_type in other_entries for other_entries in indexes) for indexes in others):
+                result.append(shape)
+
+    return result
+
+
+def _kind_indexes(kind):
+    # Subclasses count as their parent kind too, so there may be
+    # several indexes for one kind
+    result = []
+
+    for cls, entries in shapes_by_kind.items():
+        if type(kind) == str:
+            matched = kind.lower() in cls._kind_names()
+        else:
+            matched = issubclass(cls, kind)
+
+        if matched:
+            result.append(entries)
+
+    return result
+
+
+def group_shapes(shapes):
+    """Returns a shape group containing the given shapes.  Setting color,
+    elasticity, friction, group, gravity, or velocity on a shape group sets
+    it on every shape in the group, much faster than setting it on each
+    shape in a loop.
+
+    :param shapes: the shapes to put in the group
+    :type shapes: [shape, ...]
+    :rtype: shape group
+    """
+    from .shape_group import ShapeGroup
+
+    return ShapeGroup(shapes)
+
+
+def state_arrays():
+    """Returns the positions, velocities, and angles of all the active shapes
+    that have a body of their own, as NumPy arrays.  This is much faster than
+    looping over the shapes in an observer to work out things like the center
+    of mass or total energy.  NumPy must be installed to use this.
+
+    The arrays are reused by the next call, so copy them if you need to keep
+    them around.  Row i of each array is for the shape whose collision_type
+    is ids[i].
+
+    :rtype: (positions, velocities, angles, ids) where positions and velocities
+        are N x 2 arrays, angles are in degrees
+    """
+    if _state_snapshot() is None:
+        print("state_arrays needs NumPy to be installed")
+        return None
+
+    return state_snapshot.update(space, shapes, shapes_version)
+
+
+def _state_snapshot():
+    global state_snapshot
+
+    if state_snapshot is None:
+        try:
+            from .state_snapshot import StateSnapshot
+        except ImportError:
+            return None
+
+        state_snapshot = StateSnapshot()
+
+    return state_snapshot
+
+
+def set_collision_events(enabled, handler=None):
+    """Turns on recording the collisions that begin and end during each time
+    step.  The collisions are found all at once after each time step rather than
+    calling a function for every collision, which is much faster in scenes with
+    thousands of shapes touching.  NumPy must be installed to use this.
+
+    If a handler function is given, it is called once per time step with all the
+    collisions from that step, as NumPy arrays:
+
+        handler(kinds, ids, points, normals, impulses)
+
+    kinds is 0 for a collision that began and 1 for one that ended.  ids holds
+    the collision_type of the two shapes in each collision (use shape_of to get
+    the shapes), points and normals hold the (x, y) contact point and collision
+    normal, and impulses how hard the shapes hit.  Collisions that ended have the
+    point and normal from when the shapes last touched, and no impulse.
+
+    :param enabled: True to record collisions, False to stop
+    :type enabled: bool
+    :param handler: the function to call each time step, or None
+    """
+    global collision_recorder
+
+    if not enabled:
+        collision_recorder = None
+        return
+
+    try:
+        from .collision_queue import CollisionQueue
+    except ImportError:
+        print("Collision events need NumPy and pymunk 6.6 or newer to be installed")
+        return
+
+    if _state_snapshot() is None:
+        return
+
+    collision_recorder = CollisionQueue(handler)
+
+
+def collision_events():
+    """Returns the collisions that began or ended during the last time step,
+    as the same NumPy arrays passed to the handler given to set_collision_events.
+
+    :rtype: (kinds, ids, points, normals, impulses)
+    """
+    if collision_recorder is None:
+        print("Collision events must be turned on with set_collision_events first")
+        return None
+
+    return collision_recorder.events
+
+
 def deactivate(shape):
     """Removes the given shape from the simulation.  The shape will no longer
     display or interact with other objects
@@ -870,8 +2085,11 @@ def deactivate(shape):
     if not shape.active:
         return
 
+    if shape._world is not _world:
+        return _in_own_world(shape, deactivate)
+
     shape.deactivate()
-    del shapes[shape.collision_type]
+    _remove_shape(shape)
 
 
 def reactivate(shape):
@@ -883,8 +2101,11 @@ def reactivate(shape):
     if shape.active:
         return
 
+    if shape._world is not _world:
+        return _in_own_world(shape, reactivate)
+
     shape.reactivate()
-    shapes[shape.collision_type] = shape
+    _add_shape(shape)
 
 
 def add_collision(shape1, shape2, handler):
@@ -892,27 +2113,121 @@ def add_collision(shape1, shape2, handler):
     The handler function is called once per collision, at the very start of the
     collision.
 
+    Either shape may instead be a category: a tag added with add_tag, or a kind
+    of shape such as 'ball' or 'box'.  The handler is then called when a shape
+    in that category is part of the collision, e.g.
+    add_collision('ball', floor, handler).  Categories only need one handler no
+    matter how many shapes are in them.
+
     The handler function is passed three parameters.  The first two are the
-    colliding shapes, the third is the point of the collision, e.g.:
+    colliding shapes, in the same order as given to add_collision, the third is
+    the point of the collision, e.g.:
 
         handler(shape1, shape2, p)
 
-    :param shape1: the first shape in the collision
-    :param shape2: the other shape in the collision
+    :param shape1: the first shape in the collision, or a category
+    :param shape2: the other shape in the collision, or a category
     :param handler: the function to call
     :return:
     """
-    temp = space.add_collision_handler(shape1.collision_type, shape2.collision_type)
+    if type(shape1) == str and type(shape2) == str:
+        category_pairs.append((shape1, shape2, handler))
+        _use_category_handler()
+    elif type(shape1) == str:
+        shape_categories.setdefault(shape2.collision_type, []).append((shape1, handler, False))
+        _use_category_handler()
+    elif type(shape2) == str:
+        shape_categories.setdefault(shape1.collision_type, []).append((shape2, handler, True))
+        _use_category_handler()
+    else:
+        # pymunk doesn't pickle the handler's data, so the pair is also
+        # kept in the world to put the handler back after unpickling
+        collision_handlers.append((shape1.collision_type, shape2.collision_type, handler))
+        _install_collision_handler(space, shape1.collision_type, shape2.collision_type, handler)
+
+
+def _install_collision_handler(space, collision_type1, collision_type2, handler):
+    temp = space.add_collision_handler(collision_type1, collision_type2)
     temp.data['handler'] = handler
     temp.begin = handle_collision
 
 
 def handle_collision(arbiter, space, data):
-    shape1 = shapes[arbiter.shapes[0].collision_type]
-    shape2 = shapes[arbiter.shapes[1].collision_type]
+    shape1 = shape_of(arbiter.shapes[0])
+    shape2 = shape_of(arbiter.shapes[1])
     p = arbiter.contact_point_set.points[0].point_a
 
-    return data['handler'](shape1, shape2, p)
+    result = data['handler'](shape1, shape2, p)
+
+    # Shapes with their own handler don't go through the default
+    # handler, so their categories have to be checked here
+    if (shape_categories or category_pairs) and not _handle_categories(shape1, shape2, p):
+        return False
+
+    return result
+
+
+def shape_of(pymunk_shape):
+    """Returns the sandbox shape that a pymunk shape belongs to, or None if
+    that shape is not active.  A collision_type, such as the ids from
+    state_arrays or collision events, may be given instead of a pymunk shape.
+
+    :param pymunk_shape: the pymunk shape, for example from arbiter.shapes
+    :rtype: shape
+    """
+    if isinstance(pymunk_shape, pymunk.Shape):
+        return shapes.get(pymunk_shape.collision_type)
+
+    return shapes.get(int(pymunk_shape))
+
+
+def _use_category_handler():
+    # Collisions in categories are all handled by pymunk's default
+    # handler, so there is one handler however many shapes there are
+    global category_handler
+
+    if category_handler is None:
+        category_handler = space.add_default_collision_handler()
+        category_handler.begin = _handle_category_collision
+
+
+def _handle_category_collision(arbiter, space, data):
+    shape1 = shape_of(arbiter.shapes[0])
+    shape2 = shape_of(arbiter.shapes[1])
+
+    if shape1 is None or shape2 is None:
+        return True
+
+    return _handle_categories(shape1, shape2, arbiter.contact_point_set.points[0].point_a)
+
+
+def _handle_categories(shape1, shape2, p):
+    # Returns False if any handler asked for the collision to be ignored
+    result = True
+
+    for shape, other in ((shape1, shape2), (shape2, shape1)):
+        for category, handler, shape_first in shape_categories.get(shape.collision_type, ()):
+            if other._in_category(category):
+                if shape_first:
+                    handled = handler(shape, other, p)
+                else:
+                    handled = handler(other, shape, p)
+
+                if handled is False:
+                    result = False
+
+    for category1, category2, handler in category_pairs:
+        if shape1._in_category(category1) and shape2._in_category(category2):
+            handled = handler(shape1, shape2, p)
+        elif shape2._in_category(category1) and shape1._in_category(category2):
+            handled = handler(shape2, shape1, p)
+        else:
+            continue
+
+        if handled is False:
+            result = False
+
+    return result
 
 def _calc_margins():
     global x_margin
@@ -930,6 +2245,259 @@ def _calc_margins():
             y_margin = y
 
 
+def _handle_events():
+    global clicked
+
+    running = True
+    keys = []
+
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+
+        if event.type == pygame.KEYDOWN:
+            keys.append(event.key)
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            clicked = True
+
+    return running, keys
+
+
+def _notify_observers(keys):
+    global clicked
+    global observer_step
+    global last_observer_calls
+
+    # Work out who to call before calling anyone, since
+    # observers may add or remove observers while running
+    current = [observer for observer in observers if observer.due(observer_step)]
+
+    if keys and key_observers:
+        for key in set(keys):
+            current += key_observers.get(key, [])
+
+        current.sort(key=Observer.sort_key)
+
+    for observer in current:
+        observer.hook(keys)
+
+    observer_step += 1
+    last_observer_calls = len(current)
+    clicked = False
+
+
+def _measure(phase, start, frame_scheduler=None):
+    seconds = time.perf_counter() - start
+    profiler.record(phase, seconds)
+
+    if frame_scheduler:
+        frame_scheduler.measure(phase, seconds)
+
+
+def _step_physics(dt):
+    substep_dt = dt / physics_substeps
+
+    if broadphase_tuner is not None:
+        broadphase_tuner.update(space, len(shapes))
+
+    for substep in range(physics_substeps):
+        space.step(substep_dt)
+
+        if collision_recorder is not None:
+            collision_recorder.collect(space, state_snapshot, shapes, shapes_version)
+
+    if collision_recorder is not None:
+        collision_recorder.flush()
+
+
+def _save_state():
+    # Remember where the dynamic bodies were before the last
+    # time step of a frame so drawing can interpolate
+    previous_state.clear()
+
+    for body in space.bodies:
+        # Sleeping bodies aren't moving, and setting their position
+        # while drawing would wake them up
+        if body.body_type == pymunk.Body.DYNAMIC and not body.is_sleeping:
+            previous_state[body] = (body.position, body.angle)
+
+
+def _outside_margins(position):
+    return position.x > win_width + x_margin or position.x < -x_margin or \
+        position.y > win_height + y_margin or position.y < -y_margin
+
+
+def _remove_offscreen_shapes():
+    # Should automatically remove any shapes that are
+    # far enough below the bottom edge of the window
+    # that they won't be involved in anything visible
+    global cull_countdown
+    global out_of_bounds
+
+    cull_countdown -= 1
+
+    if cull_countdown > 0:
+        return
+
+    cull_countdown = cull_interval
+
+    # Only shapes touching the area outside the margins
+    # need to be looked at, so ask the space for those
+    left = -x_margin
+    right = win_width + x_margin
+    top = -y_margin
+    bottom = win_height + y_margin
+    far = 1e9
+
+    bodies = set()
+    if broadphase_tuner is not None and broadphase_tuner.using_hash:
+        # The spatial hash looks at every one of its cells that a query
+        # covers, so the huge boxes below would take forever
+        bodies.update(space.bodies)
+    else:
+        for bb in (pymunk.BB(-far, -far, left, far), pymunk.BB(right, -far, far, far),
+                   pymunk.BB(-far, -far, far, top), pymunk.BB(-far, bottom, far, far)):
+            for found in space.bb_query(bb, pymunk.ShapeFilter()):
+                bodies.add(found.body)
+
+    outside = {}
+    for body in bodies:
+        # Sleeping bodies aren't going anywhere
+        if body.is_sleeping or not _outside_margins(body.position):
+            continue
+
+        # Joints are removed along with the body they're attached to
+        for attached in list(body.shapes) + list(body.constraints):
+            shape = shapes.get(getattr(attached, 'collision_type', None))
+
+            if shape is not None and shape.body is body:
+                outside[shape.collision_type] = shape
+
+    for collision_type, shape in unqueried_shapes.items():
+        if _outside_margins(shape.position):
+            outside[collision_type] = shape
+
+    seen = {}
+    for collision_type, shape in outside.items():
+        seen[collision_type] = out_of_bounds.get(collision_type, 0) + 1
+
+    out_of_bounds = seen
+
+    for collision_type, shape in outside.items():
+        if out_of_bounds[collision_type] >= cull_hysteresis:
+            deactivate(shape)
+
+
+def _wrap_shapes():
+    # Also adjust positions for any shapes that are supposed
+    # to wrap and have gone off an edge of the screen.
+    for collision_type, shape in wrapping_shapes.items():
+        if shape.body is not None and shape.body.is_sleeping:
+            continue
+
+        x, y = shape.position
+        new_x, new_y = x, y
+
+        if shape.wrap_x:
+            if x < 0:
+                new_x = win_width - 1
+            elif x >= win_width:
+                new_x = 0
+
+        if shape.wrap_y:
+            if y < 0:
+                new_y = win_height - 1
+            elif y >= win_height:
+                new_y = 0
+
+        if new_x == x and new_y == y:
+            continue
+
+        if shape.body:
+            shape.body.position = (new_x, new_y)
+            space.reindex_shapes_for_body(shape.body)
+            previous_state.pop(shape.body, None)
+        else:
+            shape._x = new_x
+            shape._y = new_y
+
+        shape._redraw_background()
+
+
+def _draw_shapes(screen, poses=None):
+    # Returns the parts of the screen that changed, or None
+    # if the whole screen was redrawn.  poses has where to draw
+    # moving bodies when drawing between time steps.
+    global background
+    global drawn_rects
+
+    redraw_all = not dirty_rects or drawn_rects is None
+
+    if background is None or background.get_size() != screen.get_size():
+        background = pygame.Surface(screen.get_size())
+        background.fill((255, 255, 255))
+        redraw_all = True
+
+        for collision_type, shape in background_shapes.items():
+            shape.draw(background)
+
+    if redraw_all:
+        screen.blit(background, (0, 0))
+    else:
+        # Erase the shapes where they were drawn last frame
+        for rect in drawn_rects:
+            screen.blit(background, rect, rect)
+
+    rects = []
+
+    if sprite_cache is None:
+        drawn = foreground_shapes.values()
+    else:
+        # Shapes with cached images are drawn all at once,
+        # underneath shapes that are drawn one at a time
+        drawn = []
+        batch = []
+
+        for collision_type, shape in foreground_shapes.items():
+            sprite = shape.visible and shape._sprite(sprite_cache, poses)
+
+            if sprite:
+                batch.append(sprite)
+            else:
+                drawn.append(shape)
+
+        rects += screen.blits(batch)
+
+    for shape in drawn:
+        rect = shape.draw(screen, poses)
+
+        if rect:
+            rects.append(rect)
+
+    if redraw_all:
+        changed = None
+    else:
+        changed = drawn_rects + rects
+
+    drawn_rects = rects
+
+    return changed
+
+
+def _draw_interpolated(screen, alpha):
+    # Draw bodies part of the way back to where they were before the
+    # last time step.  The bodies themselves aren't moved, since setting
+    # a body's position or angle wakes it up and keeps it from sleeping.
+    poses = {}
+
+    for body, (position, angle) in previous_state.items():
+        poses[body] = (position.interpolate_to(body.position, alpha),
+                       angle + (body.angle - angle) * alpha)
+
+    return _draw_shapes(screen, poses)
+
+
 def run(do_physics=True):
     """Call this after you have created all your shapes to actually run the simulation.
     This function returns only when the user has closed the simulation window.
@@ -940,84 +2508,243 @@ def run(do_physics=True):
     :param do_physics: Should physics be activated or not
     :type do_physics: bool
     """
-    global clicked
+    global scheduler
+    global profiler
+    global drawn_rects
 
     _calc_margins()
+    drawn_rects = None
 
     screen = pygame.display.set_mode((win_width, win_height))
     pygame.display.set_caption(win_title)
     clock = pygame.time.Clock()
+    scheduler = FrameScheduler(1.0 / frame_rate, max_skipped_frames, load_shedding,
+                               physics_dt, max_frame_time)
+    profiler = Profiler()
+    profile_font = get_font('Courier', 12)
     running = True
+    pending_keys = []
+    accumulator = 0.0
+    frame_time = 1.0 / frame_rate
 
     while running:
-        keys = []
-        clicked = False
+        frame_start = start = time.perf_counter()
+        running, keys = _handle_events()
+        pending_keys += keys
+        _measure('events', start, scheduler)
+
+        if do_physics:
+            # Run as many fixed time steps as needed to catch up with
+            # the real time that passed, so a slow frame skips drawing
+            # rather than slowing the simulation down
+            accumulator += min(frame_time, max_frame_time)
+            due = int(accumulator / physics_dt)
+            steps = scheduler.plan(due)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+            # Frames that run no time steps keep drawing between the
+            # same two states, which are only replaced by the last step
+            if not interpolate:
+                previous_state.clear()
 
-            if event.type == pygame.KEYDOWN:
-                keys.append(event.key)
+            for step in range(steps):
+                if interpolate and step == steps - 1:
+                    _save_state()
 
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                clicked = True
+                start = time.perf_counter()
+                _notify_observers(pending_keys)
+                pending_keys = []
+                _measure('observers', start, scheduler)
 
-        for observer in observers:
-            observer(keys)
+                start = time.perf_counter()
+                _step_physics(physics_dt)
+                _measure('physics', start, scheduler)
 
-        screen.fill((255, 255, 255))
+            accumulator -= due * physics_dt
+        else:
+            scheduler.plan(0)
 
-        # Should automatically remove any shapes that are
-        # far enough below the bottom edge of the window
-        # that they won't be involved in anything visible
-        shapes_to_remove = []
-        for collision_type, shape in shapes.items():
-            if shape.position.x > win_width + x_margin:
-                shapes_to_remove.append(shape)
+            start = time.perf_counter()
+            _notify_observers(pending_keys)
+            pending_keys = []
+            _measure('observers', start, scheduler)
 
-            if shape.position.x < -x_margin:
-                shapes_to_remove.append(shape)
+        if scheduler.should_run('cull'):
+            start = time.perf_counter()
+            _remove_offscreen_shapes()
+            _measure('cull', start, scheduler)
 
-            if shape.position.y > win_height + y_margin:
-                shapes_to_remove.append(shape)
+        if scheduler.should_run('wrap'):
+            start = time.perf_counter()
+            _wrap_shapes()
+            _measure('wrap', start, scheduler)
 
-            if shape.position.y < -y_margin:
-                shapes_to_remove.append(shape)
+        if scheduler.should_run('draw'):
+            start = time.perf_counter()
 
-        for shape in shapes_to_remove:
-            deactivate(shape)
+            if previous_state:
+                changed = _draw_interpolated(screen, accumulator / physics_dt)
+            else:
+                changed = _draw_shapes(screen)
 
-        # Also adjust positions for any shapes that are supposed
-        # to wrap and have gone off an edge of the screen.
-        for collision_type, shape in shapes.items():
-            if shape.wrap_x:
-                if shape.position.x < 0:
-                    shape.position = (win_width - 1, shape.position.y)
+            if profile_overlay:
+                rect = profiler.draw(screen, profile_font)
+                drawn_rects.append(rect)
 
-                if shape.position.x >= win_width:
-                    shape.position = (0, shape.position.y)
+                if changed is not None:
+                    changed.append(rect)
 
-            if shape.wrap_y:
-                if shape.position.y < 0:
-                    shape.position = (shape.position.x, win_height - 1)
+            _measure('draw', start, scheduler)
 
-                if shape.position.y >= win_height:
-                    shape.position = (shape.position.x, 0)
+            start = time.perf_counter()
 
-        # Now draw the shapes that are left
-        for collision_type, shape in shapes.items():
-            shape.draw(screen)
+            if changed is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(changed)
 
-        if do_physics:
-            space.step(1 / 50.0)
+            _measure('flip', start, scheduler)
 
-        pygame.display.flip()
-        clock.tick(50)
+        _measure('frame', frame_start)
+        frame_time = clock.tick(frame_rate) / 1000.0
 
+    forget_fonts()
     pygame.quit()
 
 
+def run_headless(steps, dt=None):
+    """Runs the simulation for a fixed number of time steps without opening
+    a window.  Nothing is drawn and the simulation is not slowed down to
+    real time, so the steps run as fast as the computer allows.  Observer
+    functions, removal of off screen shapes, and wrapping all still happen
+    each time step.  Observers are passed an empty list of keys and
+    mouse_clicked() always returns False.
+
+    Returns a dictionary of statistics about the run:
+
+        steps: the number of time steps run
+        wall_time: how many seconds the run took
+        steps_per_sec: the number of time steps run per second
+        active_shapes: a list with the number of active shapes after each time step
+
+    :param steps: The number of time steps to run
+    :type steps: int
+    :param dt: The number of seconds of simulated time in each time step, None uses the time step from set_timestep
+    :type dt: float
+    :rtype: dict
+    """
+    global clicked
+    global profiler
+
+    if dt is None:
+        dt = physics_dt
+
+    _calc_margins()
+    clicked = False
+    profiler = Profiler()
+    active_shapes = []
+
+    run_start = time.perf_counter()
+
+    for step in range(steps):
+        frame_start = start = time.perf_counter()
+        _notify_observers([])
+        _measure('observers', start)
+
+        start = time.perf_counter()
+        _remove_offscreen_shapes()
+        _measure('cull', start)
+
+        start = time.perf_counter()
+        _wrap_shapes()
+        _measure('wrap', start)
+
+        start = time.perf_counter()
+        _step_physics(dt)
+        _measure('physics', start)
+
+        active_shapes.append(len(shapes))
+        _measure('frame', frame_start)
+
+    wall_time = time.perf_counter() - run_start
+
+    if wall_time > 0:
+        steps_per_sec = steps / wall_time
+    else:
+        steps_per_sec = 0.0
+
+    return {'steps': steps,
+            'wall_time': wall_time,
+            'steps_per_sec': steps_per_sec,
+            'active_shapes': active_shapes}
+
+
+def sweep(scene_fn, param_grid, steps, metrics, workers=None, dt=None):
+    """Runs the same scene many times with different parameters, each in a
+    new world, spread across several processes.  For each job scene_fn is
+    called with that job's parameters as keyword arguments to create the
+    shapes and set gravity, elasticity, and so on.  The simulation is then
+    run headless for steps time steps and each metric function is called
+    with whatever scene_fn returned.
+
+    Returns an iterator with one dictionary per job, in the order the jobs
+    finish rather than the order they were given:
+
+        job: the job's position in the parameter grid
+        params: the job's parameters
+        metrics: a dictionary with the value of each metric, or None if the job failed
+        error: the error message if the job failed, otherwise None
+        wall_time: how many seconds the simulation took
+        steps_per_sec: the number of time steps run per second
+
+    Since the jobs run in other processes, scene_fn and the metric functions
+    must be ordinary functions defined at the top level of a file, not
+    lambdas, and the code that calls sweep should be inside an
+    if __name__ == '__main__': block.
+
+    :param scene_fn: the function that sets up each job's scene
+    :type scene_fn: function
+    :param param_grid: a dictionary of lists of values to try every combination of, or a list of dictionaries
+    :type param_grid: dict or list
+    :param steps: The number of time steps to run each job for
+    :type steps: int
+    :param metrics: a dictionary of metric names and the functions that measure them
+    :type metrics: dict
+    :param workers: the number of processes to use, None uses one per core
+    :type workers: int
+    :param dt: The number of seconds of simulated time in each time step, None uses the time step the scene sets
+    :type dt: float
+    :rtype: iterator
+    """
+    if not callable(scene_fn):
+        print("Scene function must be a function")
+        return iter(())
+
+    if type(param_grid) == dict:
+        if not all(type(values) in (list, tuple, range) for values in param_grid.values()):
+            print("Each value in the parameter grid must be a list of values")
+            return iter(())
+    elif type(param_grid) not in (list, tuple) or not all(type(params) == dict for params in param_grid):
+        print("Parameter grid must be a dictionary of lists or a list of dictionaries")
+        return iter(())
+
+    if type(steps) != int or steps <= 0:
+        print("Steps must be an int greater than 0")
+        return iter(())
+
+    if type(metrics) != dict or not all(callable(metric) for metric in metrics.values()):
+        print("Metrics must be a dictionary of functions")
+        return iter(())
+
+    if workers is not None and (type(workers) != int or workers <= 0):
+        print("Workers must be an int greater than 0")
+        return iter(())
+
+    from .parameter_sweep import grid_jobs
+    from .parameter_sweep import run_jobs
+
+    return run_jobs(scene_fn, grid_jobs(param_grid), steps, metrics, workers, dt)
+
+
 def draw():
     """Call this after you have created all your shapes to actually draw them.
     This function only returns after you close the window.
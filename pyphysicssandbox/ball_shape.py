@@ -1,12 +1,14 @@
 import pygame
 import pymunk
+import math
 
 from .base_shape import BaseShape
 from .util import to_pygame
+from .sprite_cache import cache_surface
 
 
 class Ball(BaseShape):
-    def __init__(self, space, x, y, radius, mass, static, cosmetic=False):
+    def __init__(self, space, x, y, radius, mass, static, cosmetic=False, add_to_space=True):
         if not cosmetic:
             moment = pymunk.moment_for_circle(mass, 0, radius)
 
@@ -17,7 +19,9 @@ class Ball(BaseShape):
 
             self.body.position = x, y
             self.shape = pymunk.Circle(self.body, radius)
-            space.add(self.body, self.shape)
+
+            if add_to_space:
+                space.add(self.body, self.shape)
 
         self.static = static
         self._draw_radius_line = False
@@ -27,22 +31,63 @@ class Ball(BaseShape):
 
         super().__init__(cosmetic)
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         if self._cosmetic:
             p = (self._x, self._y)
         else:
-            p = to_pygame(self.body.position)
+            position, angle = self._pose(poses)
+            p = to_pygame(position)
 
-        pygame.draw.circle(screen, self.color, p, int(self._radius), 0)
+        rect = pygame.draw.circle(screen, self.color, p, int(self._radius), 0)
 
         if self.draw_radius_line:
             if self._cosmetic:
                 p2 = (self._x+self._radius, self._y)
             else:
-                circle_edge = self.body.position + pymunk.Vec2d(self.shape.radius, 0).rotated(self.body.angle)
+                circle_edge = position + pymunk.Vec2d(self.shape.radius, 0).rotated(angle)
                 p2 = to_pygame(circle_edge)
 
-            pygame.draw.lines(screen, pygame.Color('black'), False, [p, p2], 1)
+            rect = rect.union(pygame.draw.lines(screen, pygame.Color('black'), False, [p, p2], 1))
+
+        return rect
+
+    def _sprite(self, cache, poses=None):
+        if self._cosmetic:
+            return None
+
+        position, body_angle = self._pose(poses)
+        angle = None
+
+        if self._draw_radius_line:
+            angle = cache.quantize(math.degrees(body_angle))
+
+        # Remember the last image used so most frames skip the cache lookup
+        memo = self._sprite_memo
+
+        if memo is None or memo[0] is not cache or memo[1] != angle:
+            radius = int(self._radius)
+            color = tuple(self.color)
+            image, offset = cache.get(('ball', radius, color, angle),
+                                      lambda: self._render_sprite(radius, color, angle))
+            memo = self._sprite_memo = (cache, angle, image, offset)
+
+        x, y = position
+
+        return memo[2], (int(x) + memo[3][0], int(y) + memo[3][1])
+
+    def _render_sprite(self, radius, color, angle):
+        image = cache_surface((radius * 2 + 1, radius * 2 + 1), color)
+        pygame.draw.circle(image, color, (radius, radius), radius, 0)
+
+        if angle is not None:
+            edge = pymunk.Vec2d(radius, 0).rotated_degrees(angle)
+            pygame.draw.lines(image, pygame.Color('black'), False,
+                              [(radius, radius), (radius + edge.x, radius + edge.y)], 1)
+
+        return image, (-radius, -radius)
+
+    def _inside(self, p):
+        return (p[0] - self._x) ** 2 + (p[1] - self._y) ** 2 <= self._radius ** 2
 
     def _pin_points(self):
         x1 = self.body.position.x - self.shape.radius
@@ -72,5 +117,7 @@ class Ball(BaseShape):
     def draw_radius_line(self, value):
         if type(value) == bool:
             self._draw_radius_line = value
+            self._sprite_memo = None
+            self._redraw_background()
         else:
             print("draw_radius_line value must be a True or False")
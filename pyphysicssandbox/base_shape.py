@@ -3,22 +3,27 @@ import pymunk
 import math
 
 from pyphysicssandbox import pin
-from pyphysicssandbox import win_width
-from pyphysicssandbox import win_height
-from pyphysicssandbox import space
+from pyphysicssandbox import current_world
 from pyphysicssandbox import add_observer
+from pyphysicssandbox import remove_observer
+from pyphysicssandbox import _update_wrapping
+from pyphysicssandbox import _regroup
+from pyphysicssandbox import _retag
+from pyphysicssandbox import _next_collision_type
 
 
 class BaseShape:
-    next_collision_type = 0
+    kind_names = {}
 
     def __init__(self, cosmetic=False):
         self._cosmetic = cosmetic
+        self._world = current_world()
 
         if cosmetic:
             self.body = None
             self.shape = []
         else:
+            space = self._world.space
             self.body.custom_gravity = space.gravity
             self.body.custom_damping = space.damping
             self.body.constant_velocity = None
@@ -31,23 +36,44 @@ class BaseShape:
         self._active = True
         self._visible = True
         self._debug = False
+        self._observing = False
+        self._sprite_memo = None
+        self._sleeping_points = None
+        self._tags = set()
+        self._indexed_group = None
         self.custom_velocity_func = False
 
-        BaseShape.next_collision_type += 1
-        self._collision_type = BaseShape.next_collision_type
+        self._collision_type = _next_collision_type()
 
         if type(self.shape) is list:
             for shape in self.shape:
-                shape.collision_type = BaseShape.next_collision_type
+                shape.collision_type = self._collision_type
         else:
-            self.shape.collision_type = BaseShape.next_collision_type
+            self.shape.collision_type = self._collision_type
 
-        add_observer(self.observer)
+    def __getstate__(self):
+        # Images can't be pickled, so they're drawn again when needed
+        state = self.__dict__.copy()
+        state['_sprite_memo'] = None
+        return state
 
     def observer(self, keys):
         if self._debug:
             print (repr(self))
 
+    def _needs_observer(self):
+        return self._debug and self._active
+
+    def _update_observer(self):
+        # Only shapes with something to do each time step are observers
+        if self._needs_observer():
+            if not self._observing:
+                add_observer(self.observer)
+                self._observing = True
+        elif self._observing:
+            remove_observer(self.observer)
+            self._observing = False
+
     def hit(self, direction, position):
         if self._cosmetic:
             return
@@ -57,8 +83,84 @@ class BaseShape:
     def has_own_body(self):
         return not self._cosmetic
 
+    def add_tag(self, tag):
+        if tag not in self._tags:
+            self._tags.add(tag)
+            _retag(self, tag, True)
+
+    def remove_tag(self, tag):
+        if tag in self._tags:
+            self._tags.discard(tag)
+            _retag(self, tag, False)
+
+    @property
+    def tags(self):
+        return frozenset(self._tags)
+
+    @classmethod
+    def _kind_names(cls):
+        # The lower case names of the class and its parents, so a slip
+        # motor is both a 'slipmotor' and a 'motor'
+        names = BaseShape.kind_names.get(cls)
+
+        if names is None:
+            names = frozenset(parent.__name__.lower() for parent in cls.__mro__
+                              if parent is not object and parent is not BaseShape)
+            BaseShape.kind_names[cls] = names
+
+        return names
+
+    def _in_category(self, category):
+        return category in self._tags or category.lower() in self._kind_names()
+
+    def _mobility(self):
+        if self._cosmetic:
+            return 'cosmetic'
+
+        if self.body is not None and self.body.body_type == pymunk.Body.STATIC:
+            return 'static'
+
+        return 'dynamic'
+
+    def _filter_group(self):
+        # Shapes the physics engine doesn't collide have no group
+        collision_shapes = self._collision_shapes()
+
+        if not collision_shapes:
+            return None
+
+        return collision_shapes[0].filter.group
+
     def inside(self, p):
-        mask = pygame.Surface((win_width, win_height))
+        collision_shapes = self._collision_shapes()
+
+        if not collision_shapes:
+            return self._inside(p)
+
+        for shape in collision_shapes:
+            # Checking the bounding box first is cheap
+            if self._active:
+                bb = shape.bb
+            else:
+                bb = shape.cache_bb()
+
+            if bb.contains_vect(p) and shape.point_query(p).distance <= 0:
+                return True
+
+        return False
+
+    def _collision_shapes(self):
+        if type(self.shape) is list:
+            shapes = self.shape
+        else:
+            shapes = [self.shape]
+
+        return [shape for shape in shapes if isinstance(shape, pymunk.Shape)]
+
+    def _inside(self, p):
+        # Shapes that the physics engine can't check are drawn in
+        # white on a blank surface to see if the point is covered
+        mask = pygame.Surface((self._world.win_width, self._world.win_height))
         color = self.color
         self.color = pygame.Color('white')
         self._draw(mask)
@@ -70,9 +172,50 @@ class BaseShape:
 
         return pixel == pygame.Color('white')
 
-    def draw(self, screen):
+    def draw(self, screen, poses=None):
         if self.visible:
-            self._draw(screen)
+            return self._draw(screen, poses)
+
+        return None
+
+    def _sprite(self, cache, poses=None):
+        # Shapes that can be drawn from a cached image return
+        # the image and where to put it
+        return None
+
+    def _pose(self, poses):
+        # The position and angle to draw the shape at
+        if self.body is None:
+            return self.position, 0.0
+
+        return body_pose(self.body, poses)
+
+    def _world_points(self, compute, poses=None):
+        # Sleeping bodies don't move, so the points they were last drawn
+        # at are reused instead of transforming their vertices again
+        if not self.body.is_sleeping:
+            self._sleeping_points = None
+            return compute(poses)
+
+        key = (self.body.position, self.body.angle)
+        memo = self._sleeping_points
+
+        if memo is None or memo[0] != key:
+            memo = self._sleeping_points = (key, compute(poses))
+
+        return memo[1]
+
+    def _in_background(self):
+        # Shapes that can't move are drawn on the cached background
+        if self._cosmetic:
+            return True
+
+        return self.body is not None and self.body.body_type == pymunk.Body.STATIC
+
+    def _redraw_background(self):
+        # The shape may belong to a world that isn't the current one
+        if self._in_background():
+            self._world.background = None
 
     def paste_on(self, other_shape):
         p1, p2 = self._pin_points()
@@ -86,33 +229,35 @@ class BaseShape:
 
     def deactivate(self):
         self._active = False
+        self._update_observer()
 
         if type(self.shape) is list:
             for s in self.shape:
-                space.remove(s)
+                self._world.space.remove(s)
 
             if self.has_own_body():
-                space.remove(self.body)
+                self._world.space.remove(self.body)
         else:
             if self.has_own_body():
-                space.remove(self.shape, self.body)
+                self._world.space.remove(self.shape, self.body)
             else:
-                space.remove(self.shape)
+                self._world.space.remove(self.shape)
 
     def reactivate(self):
         self._active = True
+        self._update_observer()
 
         if type(self.shape) is list:
             for s in self.shape:
-                space.add(s)
+                self._world.space.add(s)
 
             if self.has_own_body():
-                space.add(self.body)
+                self._world.space.add(self.body)
         else:
             if self.has_own_body():
-                space.add(self.shape, self.body)
+                self._world.space.add(self.shape, self.body)
             else:
-                space.add(self.shape)
+                self._world.space.add(self.shape)
 
     @property
     def angle(self):
@@ -125,7 +270,8 @@ class BaseShape:
     def angle(self, value):
         if type(value) == float or type(value) == int:
             self.body.angle = math.radians(-value)
-            space.reindex_shape(self.shape)
+            self._world.space.reindex_shape(self.shape)
+            self._redraw_background()
         else:
             print("Angle value must be a number")
 
@@ -137,6 +283,7 @@ class BaseShape:
     def debug(self, value):
         if type(value) == bool:
             self._debug = value
+            self._update_observer()
         else:
             print("Debug value must be a boolean")
 
@@ -166,9 +313,11 @@ class BaseShape:
         if type(value) == int:
             if self.body:
                 self.body.position = (value, self.body.position[1])
-                space.reindex_shape(self.shape)
+                self._world.space.reindex_shape(self.shape)
             else:
                 self._x = value
+
+            self._redraw_background()
         else:
             print("X value must be an int")
 
@@ -177,9 +326,11 @@ class BaseShape:
         if type(value) == int:
             if self.body:
                 self.body.position = (self.body.position[0], value)
-                space.reindex_shape(self.shape)
+                self._world.space.reindex_shape(self.shape)
             else:
                 self._y = value
+
+            self._redraw_background()
         else:
             print("Y value must be an int")
 
@@ -188,10 +339,12 @@ class BaseShape:
         if type(value) == tuple and len(value) == 2:
             if self.body:
                 self.body.position = value
-                space.reindex_shape(self.shape)
+                self._world.space.reindex_shape(self.shape)
             else:
                 self._x = value[0]
                 self._y = value[1]
+
+            self._redraw_background()
         else:
             print("Position value must be a (x, y) tuple")
 
@@ -265,6 +418,7 @@ class BaseShape:
         if type(value) == bool:
             self._wrap_x = value
             self._wrap_y = value
+            _update_wrapping(self)
         else:
             print("Wrap value must be True or False")
 
@@ -276,6 +430,7 @@ class BaseShape:
     def wrap_x(self, value):
         if type(value) == bool:
             self._wrap_x = value
+            _update_wrapping(self)
         else:
             print("Wrap value must be True or False")
 
@@ -287,6 +442,7 @@ class BaseShape:
     def wrap_y(self, value):
         if type(value) == bool:
             self._wrap_y = value
+            _update_wrapping(self)
         else:
             print("Wrap value must be True or False")
 
@@ -298,6 +454,7 @@ class BaseShape:
     def visible(self, value):
         if type(value) == bool:
             self._visible = value
+            self._redraw_background()
         else:
             print("Visible value must be True or False")
 
@@ -309,6 +466,8 @@ class BaseShape:
     def color(self, value):
         if type(value) == pygame.Color:
             self._color = value
+            self._sprite_memo = None
+            self._redraw_background()
         else:
             print("Color value must be a Color instance")
 
@@ -327,6 +486,8 @@ class BaseShape:
                     shape.filter = pymunk.ShapeFilter(group=value)
             else:
                 self.shape.filter = pymunk.ShapeFilter(group=value)
+
+            _regroup(self)
         else:
             print("Group value must be an integer")
 
@@ -389,6 +550,28 @@ class BaseShape:
         else:
             print("Velocity value must be an x,y tuple")
 
+def body_pose(body, poses):
+    # Where to draw a body.  While drawing between time steps, poses has
+    # the position and angle of each moving body part of the way from
+    # where it was to where it is, without moving the body itself.
+    if poses:
+        pose = poses.get(body)
+
+        if pose is not None:
+            return pose
+
+    return body.position, body.angle
+
+
+def local_to_world(body, point, poses):
+    if not poses or body not in poses:
+        return body.local_to_world(point)
+
+    position, angle = poses[body]
+
+    return position + pymunk.Vec2d(*point).rotated(angle)
+
+
 def adjust_velocity(body, gravity, damping, dt):
     if body.constant_velocity:
         body.velocity = body.constant_velocity
@@ -3,10 +3,12 @@ import pymunk
 import math
 
 from .base_shape import BaseShape
+from .base_shape import local_to_world
+from .sprite_cache import cache_surface
 
 
 class Box(BaseShape):
-    def __init__(self, space, x, y, width, height, radius, mass, static, cosmetic=False):
+    def __init__(self, space, x, y, width, height, radius, mass, static, cosmetic=False, add_to_space=True):
 
         if not cosmetic:
             moment = pymunk.moment_for_box(mass, (width, height))
@@ -18,7 +20,9 @@ class Box(BaseShape):
 
             self.body.position = x, y
             self.shape = pymunk.Poly.create_box(self.body, (width, height), radius)
-            space.add(self.body, self.shape)
+
+            if add_to_space:
+                space.add(self.body, self.shape)
 
         self.width = width
         self.height = height
@@ -29,18 +33,64 @@ class Box(BaseShape):
 
         super().__init__(cosmetic)
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         if self._cosmetic:
             x = self._x-self.width/2
             y = self._y-self.height/2
 
             ps = [(x, y), (x+self.width, y), (x+self.width, y+self.height), (x,y+self.height), (x, y)]
         else:
-            ps = [self.body.local_to_world(v) for v in self.shape.get_vertices()]
-            ps += [ps[0]]
+            ps = self._world_points(self._corners, poses)
+
+        rect = pygame.draw.polygon(screen, self.color, ps)
+
+        return rect.union(pygame.draw.lines(screen, self.color, False, ps, self.radius))
+
+    def _corners(self, poses=None):
+        ps = [local_to_world(self.body, v, poses) for v in self.shape.get_vertices()]
+        ps += [ps[0]]
+
+        return ps
+
+    def _sprite(self, cache, poses=None):
+        if self._cosmetic:
+            return None
+
+        position, body_angle = self._pose(poses)
+        angle = cache.quantize(math.degrees(body_angle))
+
+        # Remember the last image used so most frames skip the cache lookup
+        memo = self._sprite_memo
+
+        if memo is None or memo[0] is not cache or memo[1] != angle:
+            color = tuple(self.color)
+            key = ('box', self.width, self.height, self.radius, color, angle)
+            image, offset = cache.get(key, lambda: self._render_sprite(color, angle))
+            memo = self._sprite_memo = (cache, angle, image, offset)
+
+        x, y = position
+
+        return memo[2], (x + memo[3][0], y + memo[3][1])
+
+    def _render_sprite(self, color, angle):
+        vertices = [pymunk.Vec2d(*v).rotated_degrees(angle) for v in self.shape.get_vertices()]
+        pad = self.radius + 1
+        left = min(v.x for v in vertices) - pad
+        top = min(v.y for v in vertices) - pad
+        width = int(max(v.x for v in vertices) - left + pad) + 1
+        height = int(max(v.y for v in vertices) - top + pad) + 1
+
+        ps = [(v.x - left, v.y - top) for v in vertices]
+        ps += [ps[0]]
+
+        image = cache_surface((width, height), color)
+        pygame.draw.polygon(image, color, ps)
+        pygame.draw.lines(image, color, False, ps, self.radius)
+
+        return image, (left, top)
 
-        pygame.draw.polygon(screen, self.color, ps)
-        pygame.draw.lines(screen, self.color, False, ps, self.radius)
+    def _inside(self, p):
+        return abs(p[0] - self._x) <= self.width / 2 and abs(p[1] - self._y) <= self.height / 2
 
     def _pin_points(self):
         x1 = self.body.position.x - (self.width/2)
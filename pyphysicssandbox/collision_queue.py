@@ -0,0 +1,131 @@
+import numpy
+
+from pymunk import batch
+
+
+class CollisionQueue:
+    # Works out which collisions began or ended during each time step by
+    # reading all of pymunk's arbiters at once after the step, instead of
+    # pymunk calling a Python function for every new contact.  Events are
+    # kept until the whole time step (all substeps) is done.
+    begin = 0
+    separate = 1
+
+    fields = batch.ArbiterFields.BODY_A_ID | batch.ArbiterFields.BODY_B_ID | \
+        batch.ArbiterFields.CONTACT_COUNT | batch.ArbiterFields.TOTAL_IMPULSE | \
+        batch.ArbiterFields.NORMAL | batch.ArbiterFields.POINT_A_1
+
+    def __init__(self, handler=None):
+        self.handler = handler
+        self.events = _no_events()
+        self._buffer = batch.Buffer()
+        self._pending = []
+
+        # The pairs of shapes touching after the last step, and the
+        # ids, point, and normal of each to report when they separate
+        self._touching = numpy.zeros(0, dtype=numpy.int64)
+        self._touching_ids = numpy.zeros((0, 2), dtype=numpy.int64)
+        self._touching_points = numpy.zeros((0, 4))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffer = batch.Buffer()
+
+    def collect(self, space, snapshot, shapes, version):
+        # Called after every space.step
+        self._buffer.clear()
+        batch.get_space_arbiters(space, self.fields, self._buffer)
+
+        ints = numpy.frombuffer(self._buffer.int_buf(), dtype=numpy.uintp).reshape(-1, 3)
+        floats = numpy.frombuffer(self._buffer.float_buf()).reshape(-1, 6)
+
+        # pymunk keeps arbiters around for a few steps after the shapes
+        # stop touching, with no contact points
+        touching = ints[:, 2] > 0
+        ints = ints[touching]
+        floats = floats[touching]
+
+        types, found = snapshot.collision_types(shapes, version, ints[:, 0:2].ravel())
+        found = found.reshape(-1, 2).all(axis=1)
+        ids = types.reshape(-1, 2)[found]
+        floats = floats[found]
+
+        # Keys are kept sorted so they can be compared with the last
+        # step's using binary searches.  Shapes made of several pymunk
+        # shapes can touch in more than one place, but only count once.
+        keys = _pair_keys(ids)
+        order = numpy.argsort(keys)
+        keys = keys[order]
+
+        first = numpy.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        order = order[first]
+        keys = keys[first]
+        ids = ids[order]
+        floats = floats[order]
+
+        began = ~_contains(self._touching, keys)
+        ended = ~_contains(keys, self._touching)
+
+        if began.any():
+            self._pending.append((numpy.full(began.sum(), self.begin),
+                                  ids[began],
+                                  floats[began, 4:6],
+                                  floats[began, 2:4],
+                                  numpy.hypot(floats[began, 0], floats[began, 1])))
+
+        if ended.any():
+            self._pending.append((numpy.full(ended.sum(), self.separate),
+                                  self._touching_ids[ended],
+                                  self._touching_points[ended, 0:2],
+                                  self._touching_points[ended, 2:4],
+                                  numpy.zeros(ended.sum())))
+
+        self._touching = keys
+        self._touching_ids = ids
+        self._touching_points = floats[:, [4, 5, 2, 3]]
+
+    def flush(self):
+        # Called once all the substeps of a time step are done
+        if self._pending:
+            self.events = tuple(numpy.concatenate(columns) for columns in zip(*self._pending))
+            self._pending = []
+        else:
+            self.events = _no_events()
+
+        if self.handler is not None and len(self.events[0]):
+            self.handler(*self.events)
+
+        return self.events
+
+
+def _pair_keys(ids):
+    # One number for each pair of shapes, whichever order they're in
+    low = numpy.minimum(ids[:, 0], ids[:, 1])
+    high = numpy.maximum(ids[:, 0], ids[:, 1])
+
+    return (low << 32) | high
+
+
+def _contains(ordered, values):
+    # Whether each of values is in the sorted array ordered
+    if not len(ordered):
+        return numpy.zeros(len(values), dtype=bool)
+
+    index = numpy.searchsorted(ordered, values)
+    index[index == len(ordered)] = 0
+
+    return ordered[index] == values
+
+
+def _no_events():
+    return (numpy.zeros(0, dtype=numpy.int64),
+            numpy.zeros((0, 2), dtype=numpy.int64),
+            numpy.zeros((0, 2)),
+            numpy.zeros((0, 2)),
+            numpy.zeros(0))
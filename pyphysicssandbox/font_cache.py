@@ -0,0 +1,66 @@
+import collections
+import pygame
+
+# Loading a system font is slow, so every text shape using the same
+# font and size shares one font object.  Text sizes and rendered
+# labels are also shared, so many text shapes with the same caption
+# (a falling letters scene, for example) only render it once.
+max_entries = 512
+
+fonts = {}
+sizes = collections.OrderedDict()
+labels = collections.OrderedDict()
+
+
+def get_font(font_name, font_size):
+    key = (font_name, font_size)
+    font = fonts.get(key)
+
+    if font is None:
+        font = pygame.font.SysFont(font_name, font_size)
+        fonts[key] = font
+
+    return font
+
+
+def forget_fonts():
+    # Fonts can't be used once pygame has quit, so they're loaded
+    # again the next time pygame starts
+    fonts.clear()
+
+
+def text_size(font_name, font_size, caption):
+    # Returns the width and height of the caption's box, which
+    # leaves out the part of the font above the letters
+    key = (font_name, font_size, caption)
+    size = sizes.get(key)
+
+    if size is None:
+        font = get_font(font_name, font_size)
+        width, height = font.size(caption)
+        size = (width, height - font.get_ascent())
+        _remember(sizes, key, size)
+    else:
+        sizes.move_to_end(key)
+
+    return size
+
+
+def render_label(font_name, font_size, caption, color):
+    key = (font_name, font_size, caption, tuple(color))
+    label = labels.get(key)
+
+    if label is None:
+        label = get_font(font_name, font_size).render(caption, True, color)
+        _remember(labels, key, label)
+    else:
+        labels.move_to_end(key)
+
+    return label
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
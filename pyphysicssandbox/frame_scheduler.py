@@ -0,0 +1,113 @@
+class FrameScheduler:
+    # Keeps a running average of how long each phase of a frame takes and
+    # decides what to leave out when the simulation is falling behind real
+    # time.  Slow frames alone don't count, since a longer frame just runs
+    # more time steps; falling behind means the time steps due each frame
+    # would keep growing until frames are longer than max_frame_time.
+    # Drawing is dropped first, then removing off screen shapes and wrapping,
+    # and only then physics time steps.
+    smoothing = 0.1
+
+    # The costs measured by each phase that can be left out
+    shed_costs = {'draw': ('draw', 'flip'), 'cull': ('cull',), 'wrap': ('wrap',)}
+
+    def __init__(self, budget, max_skipped_frames=10, enabled=True, step_time=None, max_frame_time=0.25):
+        self.budget = budget
+        self.max_skipped_frames = max_skipped_frames
+        self.enabled = enabled
+        self.step_time = step_time or budget
+        self.max_frame_time = max_frame_time
+        self.costs = {}
+        self.frames = 0
+        self.skipped = {'draw': 0, 'cull': 0, 'wrap': 0, 'physics': 0}
+        self.reasons = {}
+        self._skip = set()
+        self._skipped_in_a_row = 0
+
+    def measure(self, phase, seconds):
+        cost = self.costs.get(phase)
+
+        if cost is None:
+            self.costs[phase] = seconds
+        else:
+            self.costs[phase] = cost + (seconds - cost) * self.smoothing
+
+    def plan(self, steps):
+        # Called at the start of each frame with the number of physics
+        # time steps that are due.  Returns how many of them to run.
+        self.frames += 1
+        self._skip = set()
+
+        if not self.enabled:
+            return steps
+
+        events = self.costs.get('events', 0.0)
+        step_cost = self.costs.get('observers', 0.0) + self.costs.get('physics', 0.0)
+        physics = events + steps * step_cost
+        upkeep = self.costs.get('cull', 0.0) + self.costs.get('wrap', 0.0)
+        drawing = self.costs.get('draw', 0.0) + self.costs.get('flip', 0.0)
+
+        if self._skipped_in_a_row >= self.max_skipped_frames:
+            # Never freeze the window completely
+            self._skipped_in_a_row = 0
+        elif self._falls_behind(events + upkeep + drawing, step_cost):
+            self._shed('draw', 'falling behind')
+
+            if self._falls_behind(events + upkeep, step_cost):
+                self._shed('cull', 'physics falling behind')
+                self._shed('wrap', 'physics falling behind')
+
+        if self._skip:
+            self._skipped_in_a_row += 1
+        else:
+            self._skipped_in_a_row = 0
+
+        # Phases left out aren't measured, so their costs fade until
+        # they're tried again instead of staying high forever
+        for phase in self._skip:
+            for cost in self.shed_costs[phase]:
+                if cost in self.costs:
+                    self.costs[cost] *= 1 - self.smoothing
+
+        # Only hold back time steps when they take longer than the time
+        # they simulate, which would otherwise never catch up
+        if physics > self.budget and step_cost >= self.step_time:
+            allowed = max(1, int((self.budget - events) / step_cost))
+
+            if allowed < steps:
+                self.skipped['physics'] += steps - allowed
+                self._count_reason('physics', 'time steps over budget', steps - allowed)
+                return allowed
+
+        return steps
+
+    def _falls_behind(self, overhead, step_cost):
+        # Frames that take longer run more time steps, which makes them
+        # longer still, until they settle at overhead / spare * step_time.
+        # run() drops any time past max_frame_time, so beyond that the
+        # simulation falls behind.
+        spare = self.step_time - step_cost
+
+        if spare <= 0:
+            return True
+
+        return overhead / spare * self.step_time > self.max_frame_time
+
+    def should_run(self, phase):
+        return phase not in self._skip
+
+    def _shed(self, phase, reason):
+        self._skip.add(phase)
+        self.skipped[phase] += 1
+        self._count_reason(phase, reason, 1)
+
+    def _count_reason(self, phase, reason, count):
+        key = phase + ': ' + reason
+        self.reasons[key] = self.reasons.get(key, 0) + count
+
+    def stats(self):
+        return {'frames': self.frames,
+                'budget': self.budget,
+                'skipped': dict(self.skipped),
+                'reasons': dict(self.reasons),
+                'costs': dict(self.costs)}
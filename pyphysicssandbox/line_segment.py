@@ -2,6 +2,7 @@ import pygame
 import pymunk
 
 from .base_shape import BaseShape
+from .base_shape import local_to_world
 
 
 class Line(BaseShape):
@@ -30,15 +31,35 @@ class Line(BaseShape):
 
         super().__init__(cosmetic)
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         if self._cosmetic:
             p1 = self._p1
             p2 = self._p2
         else:
-            p1 = self.body.local_to_world(self.shape.a)
-            p2 = self.body.local_to_world(self.shape.b)
+            p1, p2 = self._world_points(self._end_points, poses)
 
-        pygame.draw.line(screen, self.color, p1, p2, self.radius)
+        return pygame.draw.line(screen, self.color, p1, p2, self.radius)
+
+    def _end_points(self, poses=None):
+        return local_to_world(self.body, self.shape.a, poses), local_to_world(self.body, self.shape.b, poses)
+
+    def _inside(self, p):
+        x1, y1 = self._p1
+        x2, y2 = self._p2
+        dx = x2 - x1
+        dy = y2 - y1
+        length = dx * dx + dy * dy
+
+        # Closest point on the line to p
+        if length == 0:
+            t = 0
+        else:
+            t = max(0, min(1, ((p[0] - x1) * dx + (p[1] - y1) * dy) / length))
+
+        x = x1 + t * dx
+        y = y1 + t * dy
+
+        return (p[0] - x) ** 2 + (p[1] - y) ** 2 <= (self.radius / 2) ** 2
 
     def _pin_points(self):
         p1 = self.body.local_to_world(self.shape.a)
@@ -18,17 +18,18 @@ class Motor(BaseShape):
     def has_own_body(self):
         return False
 
-    def _draw(self, screen):
-        p = to_pygame(self.body.position)
+    def _draw(self, screen, poses=None):
+        position, angle = self._pose(poses)
+        p = to_pygame(position)
         radius = 10
         rect = pygame.Rect(p[0] - radius/2, p[1] - radius/2, radius, radius)
 
-        pygame.draw.arc(screen, self.color, rect, 1, 6)
+        drawn = pygame.draw.arc(screen, self.color, rect, 1, 6)
 
         if self.shape.rate > 0:
-            pygame.draw.circle(screen, self.color, rect.topright, 2, 0)
-        else:
-            pygame.draw.circle(screen, self.color, rect.bottomright, 2, 0)
+            return drawn.union(pygame.draw.circle(screen, self.color, rect.topright, 2, 0))
+
+        return drawn.union(pygame.draw.circle(screen, self.color, rect.bottomright, 2, 0))
 
     def _pin_points(self):
         raise Exception('Do not use paste_on for motors')
@@ -0,0 +1,20 @@
+class Observer:
+    # An observer function along with when it should be called
+    next_order = 0
+
+    def __init__(self, hook, every=1, phase=0, priority=0, key=None):
+        self.hook = hook
+        self.every = every
+        self.phase = phase
+        self.priority = priority
+        self.key = key
+
+        Observer.next_order += 1
+        self.order = Observer.next_order
+
+    def due(self, step):
+        return step % self.every == self.phase
+
+    def sort_key(self):
+        # Higher priorities first, then in the order they were added
+        return -self.priority, self.order
@@ -0,0 +1,56 @@
+import concurrent.futures
+import itertools
+import traceback
+
+from pyphysicssandbox import World
+from pyphysicssandbox import run_headless
+
+
+def grid_jobs(param_grid):
+    # A dictionary of lists becomes every combination of the values,
+    # a list of dictionaries is used as is
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        return [dict(zip(names, values))
+                for values in itertools.product(*(param_grid[name] for name in names))]
+
+    return [dict(params) for params in param_grid]
+
+
+def run_jobs(scene_fn, jobs, steps, metrics, workers, dt):
+    # Yields each job's results as soon as it's done, whatever order the
+    # jobs finish in
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, scene_fn, params, steps, metrics, dt): index
+                   for index, params in enumerate(jobs)}
+
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                index = futures[future]
+                result = {'job': index, 'params': jobs[index]}
+                result.update(future.result())
+                yield result
+        finally:
+            # Jobs that haven't started aren't needed if the caller
+            # stopped early
+            for future in futures:
+                future.cancel()
+
+
+def run_job(scene_fn, params, steps, metrics, dt):
+    # Runs in a worker process, with a new world for every job
+    with World():
+        try:
+            scene = scene_fn(**params)
+            stats = run_headless(steps, dt)
+            values = {name: metric(scene) for name, metric in metrics.items()}
+        except Exception:
+            return {'metrics': None,
+                    'error': traceback.format_exc(),
+                    'wall_time': None,
+                    'steps_per_sec': None}
+
+    return {'metrics': values,
+            'error': None,
+            'wall_time': stats['wall_time'],
+            'steps_per_sec': stats['steps_per_sec']}
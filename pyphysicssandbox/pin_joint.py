@@ -2,6 +2,7 @@ import pygame
 import pymunk
 
 from .base_shape import BaseShape
+from .base_shape import local_to_world
 
 
 class Pin(BaseShape):
@@ -23,13 +24,17 @@ class Pin(BaseShape):
     def has_own_body(self):
         return False
 
-    def _draw(self, screen):
-        p1 = self.shape.a.local_to_world(self.shape.anchor_a)
-        p2 = self.shape.b.local_to_world(self.shape.anchor_b)
+    def _in_background(self):
+        return self.shape.a.body_type == pymunk.Body.STATIC and self.shape.b.body_type == pymunk.Body.STATIC
 
-        pygame.draw.line(screen, self.color, p1, p2, 1)
-        pygame.draw.circle(screen, self.color, (int(p1[0]), int(p1[1])), 2)
-        pygame.draw.circle(screen, self.color, (int(p2[0]), int(p2[1])), 2)
+    def _draw(self, screen, poses=None):
+        p1 = local_to_world(self.shape.a, self.shape.anchor_a, poses)
+        p2 = local_to_world(self.shape.b, self.shape.anchor_b, poses)
+
+        rect = pygame.draw.line(screen, self.color, p1, p2, 1)
+        rect = rect.union(pygame.draw.circle(screen, self.color, (int(p1[0]), int(p1[1])), 2))
+
+        return rect.union(pygame.draw.circle(screen, self.color, (int(p2[0]), int(p2[1])), 2))
 
     def _pin_points(self):
         raise Exception('Do not use paste_on for pins')
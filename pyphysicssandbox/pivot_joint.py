@@ -20,9 +20,14 @@ class Pivot(BaseShape):
         self.shape.append(join)
         self.space.add(join)
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         p = to_pygame(self.body.position)
-        pygame.draw.circle(screen, self.color, p, 5, 0)
+        return pygame.draw.circle(screen, self.color, p, 5, 0)
+
+    def _inside(self, p):
+        x, y = self.body.position
+
+        return (p[0] - x) ** 2 + (p[1] - y) ** 2 <= 5 ** 2
 
     def _pin_points(self):
         raise Exception('Do not use paste_on for pivots')
@@ -2,6 +2,8 @@ import pygame
 import pymunk
 
 from .base_shape import BaseShape
+from .base_shape import local_to_world
+from .util import point_in_polygon
 from py2d.Math.Polygon import *
 
 
@@ -36,14 +38,22 @@ class Poly(BaseShape):
 
         super().__init__(cosmetic)
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         if self._cosmetic:
-            pygame.draw.polygon(screen, self.color, [(v[0] + self._x, v[1] + self._y) for v in self._vertices])
-        else:
-            for shape in self.shape:
-                ps = [self.body.local_to_world(v) for v in shape.get_vertices()]
+            return pygame.draw.polygon(screen, self.color, [(v[0] + self._x, v[1] + self._y) for v in self._vertices])
 
-                pygame.draw.polygon(screen, self.color, ps)
+        rects = []
+
+        for ps in self._world_points(self._polygons, poses):
+            rects.append(pygame.draw.polygon(screen, self.color, ps))
+
+        return rects[0].unionall(rects[1:])
+
+    def _polygons(self, poses=None):
+        return [[local_to_world(self.body, v, poses) for v in shape.get_vertices()] for shape in self.shape]
+
+    def _inside(self, p):
+        return point_in_polygon((p[0] - self._x, p[1] - self._y), self._vertices)
 
     def _pin_points(self):
         x1 = self.body.position.x-5
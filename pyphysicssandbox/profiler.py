@@ -0,0 +1,74 @@
+import collections
+import pygame
+
+
+class Profiler:
+    # Remembers how long the most recent runs of each phase of the main
+    # loop took so that percentiles can be reported while running.
+    phases = ('events', 'observers', 'cull', 'wrap', 'draw', 'physics', 'flip', 'frame')
+
+    def __init__(self, window=200):
+        self.window = window
+        self.samples = {}
+        self._overlay = []
+        self._overlay_age = 0
+
+    def __getstate__(self):
+        # The rendered overlay can't be pickled
+        state = self.__dict__.copy()
+        state['_overlay'] = []
+        state['_overlay_age'] = 0
+        return state
+
+    def record(self, phase, seconds):
+        samples = self.samples.get(phase)
+
+        if samples is None:
+            samples = collections.deque(maxlen=self.window)
+            self.samples[phase] = samples
+
+        samples.append(seconds)
+
+    def stats(self):
+        result = {}
+
+        for phase in self.phases:
+            samples = self.samples.get(phase)
+
+            if not samples:
+                continue
+
+            ordered = sorted(samples)
+            result[phase] = {'p50': _percentile(ordered, 0.50),
+                             'p95': _percentile(ordered, 0.95),
+                             'p99': _percentile(ordered, 0.99),
+                             'count': len(ordered)}
+
+        return result
+
+    def draw(self, screen, font, refresh=25):
+        # Rendering text is slow, so only refresh the overlay every few frames
+        if self._overlay_age <= 0:
+            self._overlay = []
+            self._overlay.append(font.render('phase       p50     p95     p99 (ms)', True, pygame.Color('black')))
+
+            for phase, stats in self.stats().items():
+                line = '%-8s %7.2f %7.2f %7.2f' % (phase, stats['p50'] * 1000, stats['p95'] * 1000,
+                                                   stats['p99'] * 1000)
+                self._overlay.append(font.render(line, True, pygame.Color('black')))
+
+            self._overlay_age = refresh
+
+        self._overlay_age -= 1
+
+        y = 0
+        rects = []
+        for label in self._overlay:
+            rects.append(screen.blit(label, (0, y)))
+            y += label.get_height()
+
+        return rects[0].unionall(rects[1:])
+
+
+def _percentile(ordered, fraction):
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
@@ -0,0 +1,160 @@
+import pymunk
+
+from pyphysicssandbox import _per_shape
+from pyphysicssandbox import _per_shape_color
+from pyphysicssandbox import _per_shape_vector
+from pyphysicssandbox import _regroup
+from .base_shape import BaseShape
+
+
+class ShapeGroup:
+    # A handle on many shapes created or changed together.  Setting a
+    # property on the group checks the value once and then sets it
+    # directly on every shape, instead of going through each shape's
+    # own property.  Values may be a single value for every shape or
+    # a sequence (or NumPy array) with one value per shape.
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def __iter__(self):
+        return iter(self.shapes)
+
+    def __getitem__(self, index):
+        return self.shapes[index]
+
+    def __repr__(self):
+        return 'shape group: ' + str(len(self.shapes)) + ' shapes'
+
+    @property
+    def color(self):
+        return [shape.color for shape in self.shapes]
+
+    @color.setter
+    def color(self, value):
+        colors = _per_shape_color(value, len(self.shapes))
+
+        if colors is None:
+            return
+
+        redraw_worlds = []
+        for shape, color in zip(self.shapes, colors):
+            if type(shape).color is not BaseShape.color:
+                # Text and other shapes that do more when their color changes
+                shape.color = color
+                continue
+
+            shape._color = color
+            shape._sprite_memo = None
+
+            if shape._world not in redraw_worlds and \
+                    shape._collision_type in shape._world.background_shapes:
+                redraw_worlds.append(shape._world)
+
+        # Each shape's own world needs its background drawn again, which
+        # may not be the current world
+        for world in redraw_worlds:
+            world.background = None
+
+    @property
+    def elasticity(self):
+        return [shape.elasticity for shape in self.shapes]
+
+    @elasticity.setter
+    def elasticity(self, value):
+        values = _per_shape('elasticity', value, len(self.shapes))
+
+        if values is None:
+            return
+
+        for shape, elasticity in zip(self.shapes, values):
+            elasticity = float(elasticity)
+
+            for pymunk_shape in _pymunk_shapes(shape):
+                pymunk_shape.elasticity = elasticity
+
+    @property
+    def friction(self):
+        return [shape.friction for shape in self.shapes]
+
+    @friction.setter
+    def friction(self, value):
+        values = _per_shape('friction', value, len(self.shapes))
+
+        if values is None:
+            return
+
+        for shape, friction in zip(self.shapes, values):
+            friction = float(friction)
+
+            for pymunk_shape in _pymunk_shapes(shape):
+                pymunk_shape.friction = friction
+
+    @property
+    def group(self):
+        return [shape.group for shape in self.shapes]
+
+    @group.setter
+    def group(self, value):
+        values = _per_shape('group', value, len(self.shapes))
+
+        if values is None:
+            return
+
+        filters = {}
+        for shape, group in zip(self.shapes, values):
+            shape_filter = filters.get(group)
+
+            if shape_filter is None:
+                shape_filter = pymunk.ShapeFilter(group=int(group))
+                filters[group] = shape_filter
+
+            for pymunk_shape in _pymunk_shapes(shape):
+                pymunk_shape.filter = shape_filter
+
+            _regroup(shape)
+
+    @property
+    def gravity(self):
+        return [shape.gravity for shape in self.shapes]
+
+    @gravity.setter
+    def gravity(self, value):
+        values = _per_shape_vector('gravity', value, len(self.shapes))
+
+        if values is None:
+            return
+
+        for shape, gravity in zip(self.shapes, values):
+            if shape._cosmetic:
+                continue
+
+            shape.body.custom_gravity = gravity
+            shape._check_velocity_func()
+
+    @property
+    def velocity(self):
+        return [shape.velocity for shape in self.shapes]
+
+    @velocity.setter
+    def velocity(self, value):
+        values = _per_shape_vector('velocity', value, len(self.shapes))
+
+        if values is None:
+            return
+
+        for shape, velocity in zip(self.shapes, values):
+            if shape._cosmetic:
+                continue
+
+            shape.body.constant_velocity = velocity
+            shape._check_velocity_func()
+
+
+def _pymunk_shapes(shape):
+    if type(shape.shape) is list:
+        return shape.shape
+
+    return (shape.shape,)
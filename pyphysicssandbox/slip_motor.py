@@ -1,10 +1,7 @@
-import pygame
-import pymunk
 import math
 
 from .rotary_spring import RotarySpring
 from .motor_joint import Motor
-from pyphysicssandbox import add_observer
 from pyphysicssandbox import deactivate
 from pyphysicssandbox import reactivate
 
@@ -16,6 +13,12 @@ class SlipMotor(Motor):
         self._spring = RotarySpring(space, shape1, shape2, rest_angle, stiffness, damping)
         self._slip_angle = -slip_angle
         self._rest_angle = -rest_angle
+        self._update_observer()
+
+    def _needs_observer(self):
+        # Stays an observer while deactivated, since it
+        # reactivates itself once it springs back
+        return True
 
     def observer(self, keys):
         super().observer(keys)
@@ -0,0 +1,90 @@
+import pymunk
+
+try:
+    from pymunk import batch
+except ImportError:
+    batch = None
+
+
+class BroadphaseTuner:
+    # Chooses between pymunk's bounding box tree and its spatial hash for
+    # finding shapes that might be touching, and picks the hash's cell size
+    # and bucket count from the shapes in the space.  The choice is looked at
+    # again whenever the number of shapes changes a lot.  pymunk can't go
+    # back to the tree once the hash is in use.
+    min_shapes = 1000
+    max_size_spread = 4
+    retune_factor = 2
+
+    def __init__(self, mode, dim=None, count=None):
+        self.mode = mode
+        self.requested_dim = dim
+        self.requested_count = count
+        self.using_hash = False
+        self.dim = None
+        self.count = None
+        self.tuned_shapes = None
+
+    def update(self, space, num_shapes):
+        # Called before each time step with the number of shapes
+        if self.tuned_shapes is not None and \
+                self.tuned_shapes / self.retune_factor <= num_shapes <= self.tuned_shapes * self.retune_factor:
+            return
+
+        self.tuned_shapes = max(num_shapes, 1)
+
+        if self.requested_dim is not None and self.requested_count is not None:
+            self._use_hash(space, self.requested_dim, self.requested_count)
+            return
+
+        sizes = sorted(_size(shape.bb) for shape in space.shapes
+                       if shape.body.body_type != pymunk.Body.STATIC)
+
+        if not sizes:
+            return
+
+        median = sizes[len(sizes) // 2]
+        spread = sizes[len(sizes) * 9 // 10] / max(sizes[len(sizes) // 10], 1)
+
+        # The hash only pays off for lots of shapes of about the same size
+        if self.mode == 'auto' and not self.using_hash and \
+                (len(sizes) < self.min_shapes or spread > self.max_size_spread):
+            return
+
+        dim = self.requested_dim or max(median, 1)
+        count = self.requested_count or len(sizes) * 10
+        self._use_hash(space, dim, count)
+
+    def _use_hash(self, space, dim, count):
+        space.use_spatial_hash(dim, count)
+        self.using_hash = True
+        self.dim = dim
+        self.count = count
+
+    def stats(self, space):
+        if self.using_hash:
+            index = 'hash'
+        else:
+            index = 'tree'
+
+        return {'mode': self.mode,
+                'index': index,
+                'dim': self.dim,
+                'count': self.count,
+                'shapes': len(space.shapes),
+                'pairs': touching_pairs(space)}
+
+
+def touching_pairs(space):
+    # The number of pairs of shapes touching after the last time step
+    if batch is None:
+        return None
+
+    buffer = batch.Buffer()
+    batch.get_space_arbiters(space, batch.ArbiterFields.CONTACT_COUNT, buffer)
+
+    return sum(1 for contacts in memoryview(buffer.int_buf()).cast('N') if contacts > 0)
+
+
+def _size(bb):
+    return max(bb.right - bb.left, bb.top - bb.bottom)
@@ -17,7 +17,7 @@ class Spring(BaseShape):
     def has_own_body(self):
         return False
 
-    def _draw(self, screen):
+    def _draw(self, screen, poses=None):
         pass
 
     def _pin_points(self):
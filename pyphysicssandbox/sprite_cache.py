@@ -0,0 +1,72 @@
+import collections
+import pygame
+
+
+class SpriteCache:
+    # Pre-drawn images of shapes, keyed by whatever makes them look
+    # different (kind, size, color, angle).  The least recently used
+    # images are thrown away once they take up too much memory.
+    def __init__(self, max_bytes=16 * 1024 * 1024, angle_step=5):
+        self.max_bytes = max_bytes
+        self.angle_step = angle_step
+        self.sprites = collections.OrderedDict()
+        self.bytes = 0
+
+    def quantize(self, degrees):
+        return int(round(degrees / self.angle_step)) * self.angle_step % 360
+
+    def get(self, key, render):
+        # render is called to draw the sprite if it isn't cached.  It
+        # returns the image and the offset of its upper left corner
+        # from the center of the shape.
+        sprite = self.sprites.get(key)
+
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+
+        image, offset = render()
+
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+            image.set_colorkey(image.get_colorkey(), pygame.RLEACCEL)
+
+        sprite = (image, offset)
+        self.sprites[key] = sprite
+        self.bytes += _size_of(image)
+
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            old_key, (old_image, old_offset) = self.sprites.popitem(last=False)
+            self.bytes -= _size_of(old_image)
+
+        return sprite
+
+    def clear(self):
+        self.sprites.clear()
+        self.bytes = 0
+
+    def __getstate__(self):
+        # Images can't be pickled, so they're drawn again when needed
+        state = self.__dict__.copy()
+        state['sprites'] = collections.OrderedDict()
+        state['bytes'] = 0
+        return state
+
+
+def cache_surface(size, color):
+    # Blank image for drawing a sprite on.  Sprites use a transparent
+    # color key rather than per pixel alpha since that blits faster.
+    if tuple(color)[:3] == (255, 0, 255):
+        key = (0, 255, 0)
+    else:
+        key = (255, 0, 255)
+
+    image = pygame.Surface(size)
+    image.fill(key)
+    image.set_colorkey(key)
+
+    return image
+
+
+def _size_of(image):
+    return image.get_width() * image.get_height() * image.get_bytesize()
@@ -0,0 +1,144 @@
+import numpy
+
+try:
+    from pymunk import batch
+except ImportError:
+    batch = None
+
+
+class StateSnapshot:
+    # Copies the positions, velocities, and angles of every shape with a
+    # body of its own into NumPy arrays.  The arrays are only reallocated
+    # when shapes are added or removed, and pymunk's batch API is used to
+    # read all the bodies at once when it's available.
+    def __init__(self):
+        self.version = None
+        self.shapes = []
+        self.ids = numpy.zeros(0, dtype=numpy.int64)
+        self.positions = numpy.zeros((0, 2))
+        self.velocities = numpy.zeros((0, 2))
+        self.angles = numpy.zeros(0)
+        self._body_ids = numpy.zeros(0, dtype=numpy.uintp)
+        self._slots = numpy.zeros(0, dtype=numpy.intp)
+
+        if batch is None:
+            self._buffer = None
+        else:
+            self._buffer = batch.Buffer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        if batch is None:
+            self._buffer = None
+        else:
+            self._buffer = batch.Buffer()
+
+    def update(self, space, shapes, version):
+        # version changes whenever shapes are added or removed
+        if version != self.version:
+            self._layout(shapes)
+            self.version = version
+
+        if self.shapes:
+            if self._buffer is None:
+                self._copy_each()
+            elif not self._copy_batched(space):
+                # A shape replaced its body (text shapes do when their
+                # text changes), so the rows need working out again
+                self._layout(shapes)
+                self._copy_batched(space)
+
+            # Match the angle property of shapes
+            numpy.degrees(self.angles, out=self.angles)
+            numpy.negative(self.angles, out=self.angles)
+
+        return self.positions, self.velocities, self.angles, self.ids
+
+    def collision_types(self, shapes, version, body_ids):
+        # Returns the collision_type of the shape each body belongs to,
+        # and whether it belongs to a shape at all
+        if version != self.version:
+            self._layout(shapes)
+            self.version = version
+
+        rows, found = self._rows(body_ids)
+
+        if not found.all():
+            self._layout(shapes)
+            rows, found = self._rows(body_ids)
+
+        if not len(self.ids):
+            return numpy.zeros(len(body_ids), dtype=numpy.int64), found
+
+        return self.ids[rows], found
+
+    def _layout(self, shapes):
+        owners = [shape for shape in shapes.values() if shape.has_own_body()]
+        owners.sort(key=lambda shape: shape.collision_type)
+        count = len(owners)
+
+        self.shapes = owners
+        self.ids = numpy.array([shape.collision_type for shape in owners], dtype=numpy.int64)
+
+        if len(self.angles) != count:
+            self.positions = numpy.zeros((count, 2))
+            self.velocities = numpy.zeros((count, 2))
+            self.angles = numpy.zeros(count)
+
+        # Bodies come back from pymunk in its own order, so keep their
+        # ids sorted along with the row each one belongs in
+        body_ids = numpy.array([shape.body.id for shape in owners], dtype=numpy.uintp)
+        self._slots = numpy.argsort(body_ids)
+        self._body_ids = body_ids[self._slots]
+
+    def _copy_batched(self, space):
+        fields = batch.BodyFields.BODY_ID | batch.BodyFields.POSITION | \
+            batch.BodyFields.ANGLE | batch.BodyFields.VELOCITY
+
+        self._buffer.clear()
+        batch.get_space_bodies(space, fields, self._buffer)
+
+        data = numpy.frombuffer(self._buffer.float_buf()).reshape(-1, 5)
+        body_ids = numpy.frombuffer(self._buffer.int_buf(), dtype=numpy.uintp)
+
+        rows, found = self._rows(body_ids)
+
+        if not found.all():
+            rows = rows[found]
+            data = data[found]
+
+        if len(rows) != len(self.shapes):
+            return False
+
+        self.positions[rows] = data[:, 0:2]
+        self.angles[rows] = data[:, 2]
+        self.velocities[rows] = data[:, 3:5]
+
+        return True
+
+    def _rows(self, body_ids):
+        # Finds the row for each body id, using the sorted body ids
+        if not len(self._body_ids):
+            return numpy.zeros(len(body_ids), dtype=numpy.intp), numpy.zeros(len(body_ids), dtype=bool)
+
+        # Binary searches are much faster with the ids in order
+        order = numpy.argsort(body_ids)
+        index = numpy.empty(len(body_ids), dtype=numpy.intp)
+        index[order] = numpy.searchsorted(self._body_ids, body_ids[order])
+        index[index == len(self._body_ids)] = 0
+        found = self._body_ids[index] == body_ids
+
+        return self._slots[index], found
+
+    def _copy_each(self):
+        for i, shape in enumerate(self.shapes):
+            body = shape.body
+            self.positions[i] = body.position
+            self.velocities[i] = body.velocity
+            self.angles[i] = body.angle
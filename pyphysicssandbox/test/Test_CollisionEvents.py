@@ -0,0 +1,109 @@
+import contextlib
+import io
+import unittest
+
+import pyphysicssandbox as ps
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The kinds of event, as documented in set_collision_events
+began = 0
+ended = 1
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestCollisionEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        self.floor = ps.static_box((0, 100), 300, 20)
+        self.balls = [ps.ball((50 + i * 60, 30 + i * 15), 10) for i in range(4)]
+
+        self.step = 0
+        self.events = []
+        self.callbacks = []
+
+        ps.add_observer(self.count_step)
+
+        # pymunk's own callbacks for the same collisions to compare with
+        for ball in self.balls:
+            handler = ps.space.add_collision_handler(ball.collision_type, self.floor.collision_type)
+            handler.begin = self.on_begin
+            handler.separate = self.on_separate
+
+        ps.set_collision_events(True, self.record_events)
+
+        if ps.collision_recorder is None:
+            self.skipTest('Collision events need pymunk 6.6 or newer')
+
+    def tearDown(self):
+        ps.reset()
+
+    def count_step(self, keys):
+        self.step += 1
+
+    def on_begin(self, arbiter, space, data):
+        self.callbacks.append(self.callback_event(began, arbiter))
+        return True
+
+    def on_separate(self, arbiter, space, data):
+        self.callbacks.append(self.callback_event(ended, arbiter))
+
+    def callback_event(self, kind, arbiter):
+        ids = sorted(shape.collision_type for shape in arbiter.shapes)
+        return self.step, kind, ids[0], ids[1]
+
+    def record_events(self, kinds, ids, points, normals, impulses):
+        for kind, pair in zip(kinds.tolist(), ids.tolist()):
+            self.events.append((self.step, kind, min(pair), max(pair)))
+
+    def test_events_match_pymunk_callbacks(self):
+        ps.run_headless(150)
+
+        kinds = [event[1] for event in self.events]
+        self.assertIn(began, kinds)
+        self.assertIn(ended, kinds)
+        self.assertCountEqual(self.events, self.callbacks)
+
+    def test_collisions_that_begin_have_an_impulse(self):
+        for step in range(150):
+            ps.run_headless(1)
+            kinds, ids, points, normals, impulses = ps.collision_events()
+
+            if len(kinds):
+                break
+
+        self.assertTrue((kinds == began).all())
+        self.assertTrue((impulses > 0).all())
+        self.assertEqual(points.shape, (len(kinds), 2))
+        self.assertEqual(normals.shape, (len(kinds), 2))
+        self.assertIs(ps.shape_of(ids[0][0]).__class__, self.balls[0].__class__)
+
+    def test_steps_without_collisions_have_no_events(self):
+        ps.run_headless(1)
+
+        kinds, ids, points, normals, impulses = ps.collision_events()
+
+        self.assertEqual(len(kinds), 0)
+        self.assertEqual(ids.shape, (0, 2))
+        self.assertEqual(self.events, [])
+
+    def test_turning_events_off(self):
+        ps.set_collision_events(False)
+        ps.run_headless(150)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertIsNone(ps.collision_events())
+
+        self.assertEqual(self.events, [])
+        self.assertIn('must be turned on', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import pyphysicssandbox as ps
+from pyphysicssandbox.ball_shape import Ball
+
+
+class TestCategoryCollisions(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        self.floor = ps.static_box((0, 100), 200, 20)
+        self.ball = self.dropped_ball(50)
+        self.hits = []
+
+    def tearDown(self):
+        ps.reset()
+
+    def dropped_ball(self, x):
+        ball = ps.ball((x, 50), 10)
+        ball.elasticity = 0.0
+        return ball
+
+    def record_hit(self, shape1, shape2, p):
+        self.hits.append((shape1, shape2))
+        return True
+
+    def test_kind_and_shape(self):
+        ps.add_collision('ball', self.floor, self.record_hit)
+        ps.run_headless(60)
+
+        self.assertEqual(self.hits, [(self.ball, self.floor)])
+
+    def test_shape_and_kind_keep_their_order(self):
+        ps.add_collision(self.floor, 'ball', self.record_hit)
+        ps.run_headless(60)
+
+        self.assertEqual(self.hits, [(self.floor, self.ball)])
+
+    def test_tag_pairs_keep_their_order(self):
+        self.ball.add_tag('player')
+        self.floor.add_tag('ground')
+
+        ps.add_collision('ground', 'player', self.record_hit)
+        ps.run_headless(60)
+
+        self.assertEqual(self.hits, [(self.floor, self.ball)])
+
+    def test_shapes_created_later_are_in_the_category(self):
+        ps.add_collision('ball', 'box', self.record_hit)
+        later = self.dropped_ball(150)
+        ps.run_headless(60)
+
+        self.assertCountEqual(self.hits, [(self.ball, self.floor), (later, self.floor)])
+
+    def test_shapes_outside_the_category_are_left_out(self):
+        ps.add_collision('player', self.floor, self.record_hit)
+        ps.run_headless(60)
+
+        self.assertEqual(self.hits, [])
+
+    def test_false_ignores_the_collision(self):
+        ps.add_collision('ball', 'box', lambda shape1, shape2, p: False)
+        ps.run_headless(60)
+
+        self.assertGreater(self.ball.position.y, 120)
+
+    def test_categories_and_pair_handlers_both_run(self):
+        ps.add_collision('ball', self.floor, self.record_hit)
+        ps.add_collision(self.ball, self.floor, self.record_hit)
+        ps.run_headless(60)
+
+        self.assertEqual(self.hits, [(self.ball, self.floor), (self.ball, self.floor)])
+
+    def test_categories_match_kinds_by_class(self):
+        self.assertTrue(self.ball._in_category('ball'))
+        self.assertTrue(self.ball._in_category('Ball'))
+        self.assertFalse(self.floor._in_category('ball'))
+        self.assertIn('ball', Ball._kind_names())
+
+
+if __name__ == '__main__':
+    unittest.main()
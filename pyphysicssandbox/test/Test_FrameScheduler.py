@@ -0,0 +1,71 @@
+import unittest
+
+from pyphysicssandbox.frame_scheduler import FrameScheduler
+
+
+def simulate(frames, draw_costs, step_cost, dt=1 / 50.0, frame_rate=50, max_frame_time=0.25):
+    # Runs the scheduler the way run() does, with made up costs for each
+    # phase, and returns how many frames were drawn and time steps run
+    scheduler = FrameScheduler(1.0 / frame_rate, 10, True, dt, max_frame_time)
+    accumulator = 0.0
+    frame_time = 1.0 / frame_rate
+    drawn = 0
+    steps_run = 0
+
+    for frame in range(frames):
+        accumulator += min(frame_time, max_frame_time)
+        due = int(accumulator / dt)
+        steps = scheduler.plan(due)
+        elapsed = 0.0
+
+        for step in range(steps):
+            scheduler.measure('physics', step_cost)
+            elapsed += step_cost
+
+        accumulator -= due * dt
+        steps_run += steps
+
+        if scheduler.should_run('draw'):
+            draw_cost = draw_costs(frame)
+            scheduler.measure('draw', draw_cost)
+            elapsed += draw_cost
+            drawn += 1
+
+        frame_time = max(elapsed, 1.0 / frame_rate)
+
+    return drawn, steps_run
+
+
+class TestFrameScheduler(unittest.TestCase):
+
+    def test_slow_drawing_that_keeps_up_is_not_shed(self):
+        drawn, steps_run = simulate(500, lambda frame: 0.025, 0.001)
+
+        self.assertEqual(drawn, 500)
+
+    def test_one_expensive_frame_does_not_lock_in_shedding(self):
+        drawn, steps_run = simulate(500, lambda frame: 1.0 if frame == 0 else 0.005, 0.001)
+
+        self.assertGreaterEqual(drawn, 480)
+
+    def test_drawing_is_shed_when_falling_behind(self):
+        drawn, steps_run = simulate(500, lambda frame: 0.3, 0.001)
+
+        self.assertLess(drawn, 500)
+        self.assertGreaterEqual(drawn, 500 // 11)
+
+    def test_time_steps_are_held_back_when_physics_cannot_keep_up(self):
+        scheduler = FrameScheduler(1 / 50.0, 10, True, 1 / 50.0)
+        scheduler.measure('physics', 0.03)
+
+        self.assertEqual(scheduler.plan(5), 1)
+
+    def test_time_steps_are_not_held_back_when_physics_keeps_up(self):
+        scheduler = FrameScheduler(1 / 50.0, 10, True, 1 / 50.0)
+        scheduler.measure('physics', 0.015)
+
+        self.assertEqual(scheduler.plan(5), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
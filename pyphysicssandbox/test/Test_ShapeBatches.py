@@ -0,0 +1,99 @@
+import unittest
+
+from pygame import Color
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import pyphysicssandbox as ps
+from pyphysicssandbox.ball_shape import Ball
+from pyphysicssandbox.box_shape import Box
+
+
+class TestShapeBatches(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        self.positions = [(x * 10, y * 10) for x in range(10) for y in range(10)]
+        self.adds = 0
+        self.shapes_added = 0
+
+        space_add = ps.space.add
+        add_shape = ps._add_shape
+
+        def count_adds(*items):
+            self.adds += 1
+            space_add(*items)
+
+        def count_shapes_added(shape):
+            self.shapes_added += 1
+            add_shape(shape)
+
+        ps.space.add = count_adds
+        ps._add_shape = count_shapes_added
+        self.addCleanup(setattr, ps, '_add_shape', add_shape)
+
+    def tearDown(self):
+        ps.reset()
+
+    def test_balls_are_added_in_one_call(self):
+        version = ps.shapes_version
+        group = ps.balls(self.positions, 4)
+
+        self.assertEqual(self.adds, 1)
+        self.assertEqual(self.shapes_added, 0)
+        self.assertEqual(ps.shapes_version, version + 1)
+        self.assertEqual(len(ps.space.bodies), 100)
+        self.assertEqual(len(ps.space.shapes), 100)
+        self.assertEqual(len(group), 100)
+
+    def test_boxes_are_added_in_one_call(self):
+        ps.boxes(self.positions, 4, 4)
+
+        self.assertEqual(self.adds, 1)
+        self.assertEqual(self.shapes_added, 0)
+        self.assertEqual(len(ps.space.bodies), 100)
+        self.assertEqual(len(ps.space.shapes), 100)
+
+    def test_a_loop_adds_one_shape_at_a_time(self):
+        for position in self.positions:
+            ps.ball(position, 4)
+
+        self.assertEqual(self.adds, 100)
+        self.assertEqual(self.shapes_added, 100)
+
+    def test_batches_are_indexed_like_single_shapes(self):
+        group = ps.balls(self.positions, 4)
+        ball = ps.ball((200, 200), 4)
+        box = ps.boxes([(300, 300)], 4, 4)[0]
+
+        self.assertEqual(len(ps.shapes), 102)
+        self.assertEqual(len(ps.foreground_shapes), 102)
+        self.assertEqual(len(ps.shapes_by_kind[Ball]), 101)
+        self.assertEqual(len(ps.shapes_by_kind[Box]), 1)
+        self.assertEqual(len(ps.shapes_by_mobility['dynamic']), 102)
+        self.assertEqual(ps.unqueried_shapes, {})
+        self.assertIn(group[0], ps.find_shapes(kind='ball'))
+        self.assertIn(ball, ps.find_shapes(kind='ball'))
+        self.assertIn(box, ps.find_shapes(kind='box'))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_colors_may_be_a_numpy_array(self):
+        colors = numpy.random.randint(0, 255, (100, 3))
+        group = ps.balls(self.positions, 4, colors=colors)
+
+        self.assertEqual(group.color, [Color(*row.tolist()) for row in colors])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_box_colors_may_be_a_numpy_array(self):
+        group = ps.boxes(self.positions[:2], 4, 4, colors=numpy.array([[255, 0, 0], [0, 255, 0]]))
+
+        self.assertEqual(group.color, [Color('red'), Color(0, 255, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
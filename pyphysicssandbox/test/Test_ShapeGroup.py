@@ -0,0 +1,48 @@
+import unittest
+
+from pygame import Color
+
+import pyphysicssandbox as ps
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestShapeGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        self.group = ps.group_shapes([ps.ball((50, 50), 10), ps.box((100, 50), 10, 10)])
+
+    def tearDown(self):
+        ps.reset()
+
+    def test_one_color_for_every_shape(self):
+        self.group.color = Color('red')
+
+        self.assertEqual(self.group.color, [Color('red'), Color('red')])
+
+    def test_one_color_per_shape(self):
+        self.group.color = [(255, 0, 0), 'blue']
+
+        self.assertEqual(self.group.color, [Color('red'), Color('blue')])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_array_of_colors(self):
+        self.group.color = numpy.array([[255, 0, 0], [0, 255, 0]])
+
+        self.assertEqual(self.group.color, [Color('red'), Color(0, 255, 0)])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_array_of_elasticities(self):
+        self.group.elasticity = numpy.array([0.25, 0.5])
+
+        self.assertEqual(self.group.elasticity, [0.25, 0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import unittest
+
+import pyphysicssandbox as ps
+
+
+class TestSleep(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        ps.static_box((0, 400), 500, 20)
+
+        for i in range(5):
+            ps.ball((50 + i * 40, 380), 10).elasticity = 0.0
+
+    def tearDown(self):
+        ps.reset()
+
+    def test_resting_shapes_fall_asleep(self):
+        ps.sleep(True, 5, 0.2)
+        ps.run_headless(200)
+
+        self.assertEqual(ps.num_sleeping(), 5)
+
+    def test_disabling_wakes_sleeping_shapes(self):
+        ps.sleep(True, 5, 0.2)
+        ps.run_headless(200)
+        ps.sleep(False)
+
+        self.assertEqual(ps.num_sleeping(), 0)
+
+        ps.run_headless(50)
+
+        self.assertEqual(ps.num_sleeping(), 0)
+
+    def test_enabled_must_be_bool(self):
+        output = io.StringIO()
+
+        with contextlib.redirect_stdout(output):
+            ps.sleep('yes', 5, 0.2)
+
+        self.assertIn('must be True or False', output.getvalue())
+        self.assertEqual(ps.space.sleep_time_threshold, float('inf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import unittest
+
+import pyphysicssandbox as ps
+
+
+# Scenes and metrics run in other processes, so they have to be
+# ordinary functions at the top level of the file
+def falling_ball(g, mass=1):
+    if g < 0:
+        raise ValueError('gravity must not be negative')
+
+    ps.gravity(0, g)
+    ps.set_timestep(1 / 100.0)
+    return ps.ball((100, 10), 5, mass)
+
+
+def speed(ball):
+    return round(ball.body.velocity.y, 3)
+
+
+def shape_count(ball):
+    return ps.num_shapes()
+
+
+class TestSweep(unittest.TestCase):
+
+    def sweep(self, param_grid, steps=10):
+        results = list(ps.sweep(falling_ball, param_grid, steps, {'speed': speed, 'shapes': shape_count},
+                                workers=2))
+        return sorted(results, key=lambda result: result['job'])
+
+    def test_one_result_for_every_combination(self):
+        results = self.sweep({'g': [100, 200], 'mass': [1, 2, 3]})
+
+        self.assertEqual([result['job'] for result in results], list(range(6)))
+        self.assertEqual([result['params'] for result in results],
+                         [{'g': g, 'mass': mass} for g in [100, 200] for mass in [1, 2, 3]])
+
+        for result in results:
+            self.assertIsNone(result['error'])
+            self.assertGreater(result['wall_time'], 0)
+            self.assertGreater(result['steps_per_sec'], 0)
+
+    def test_metrics_come_from_each_jobs_own_world(self):
+        results = self.sweep([{'g': 100}, {'g': 500}])
+
+        # Ten steps of 1/100 of a second, slowed a little by damping
+        self.assertAlmostEqual(results[0]['metrics']['speed'], 10, delta=0.5)
+        self.assertAlmostEqual(results[1]['metrics']['speed'], 50, delta=2.5)
+        self.assertEqual([result['metrics']['shapes'] for result in results], [1, 1])
+
+    def test_a_failed_job_does_not_stop_the_others(self):
+        results = self.sweep({'g': [100, -1, 300]})
+
+        self.assertEqual(len(results), 3)
+        self.assertIsNone(results[1]['metrics'])
+        self.assertIsNone(results[1]['wall_time'])
+        self.assertIn('gravity must not be negative', results[1]['error'])
+        self.assertIsNone(results[0]['error'])
+        self.assertIsNone(results[2]['error'])
+
+    def test_sweeping_leaves_the_current_world_alone(self):
+        world = ps.current_world()
+        self.sweep({'g': [100]})
+
+        self.assertIs(ps.current_world(), world)
+        self.assertEqual(ps.num_shapes(), 0)
+
+    def test_bad_arguments_give_no_results(self):
+        output = io.StringIO()
+
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(list(ps.sweep(falling_ball, {'g': 100}, 10, {})), [])
+            self.assertEqual(list(ps.sweep(falling_ball, {'g': [100]}, 0, {})), [])
+            self.assertEqual(list(ps.sweep(falling_ball, {'g': [100]}, 10, {'speed': 1})), [])
+
+        self.assertIn('Each value in the parameter grid must be a list of values', output.getvalue())
+        self.assertIn('Steps must be an int greater than 0', output.getvalue())
+        self.assertIn('Metrics must be a dictionary of functions', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
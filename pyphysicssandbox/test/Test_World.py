@@ -0,0 +1,185 @@
+import pickle
+import unittest
+
+from pygame import Color
+
+import pyphysicssandbox as ps
+from pyphysicssandbox.world import _new_state
+
+# Observers and handlers have to be ordinary functions to be pickled
+hits = []
+steps = []
+
+
+def record_hit(shape1, shape2, p):
+    hits.append((shape1, shape2))
+
+
+def record_step(keys):
+    steps.append(keys)
+
+
+class TestWorld(unittest.TestCase):
+
+    def setUp(self):
+        self.other = ps.World()
+
+        with self.other:
+            self.box = ps.static_box((0, 0), 10, 10)
+
+        self.world = ps.World()
+        self.world.activate()
+
+        self.other.background = 'other background'
+        ps.background = 'current background'
+
+    def tearDown(self):
+        ps.reset()
+
+    def test_color_change_redraws_the_shapes_own_background(self):
+        self.box.color = Color('red')
+
+        self.assertIsNone(self.other.background)
+        self.assertEqual(ps.background, 'current background')
+
+    def test_group_color_change_redraws_the_shapes_own_background(self):
+        ps.group_shapes([self.box]).color = Color('red')
+
+        self.assertIsNone(self.other.background)
+        self.assertEqual(ps.background, 'current background')
+
+    def test_wrapping_a_shape_updates_its_own_world(self):
+        ps.ball((50, 50), 10)
+        self.box.wrap = True
+
+        self.assertEqual(list(self.other.wrapping_shapes.values()), [self.box])
+        self.assertEqual(ps.wrapping_shapes, {})
+
+    def test_deactivating_a_shape_leaves_the_current_world_alone(self):
+        current_ball = ps.ball((50, 50), 10)
+        self.assertEqual(current_ball.collision_type, self.box.collision_type)
+
+        ps.deactivate(self.box)
+
+        self.assertEqual(self.other.shapes, {})
+        self.assertEqual(len(self.other.space.shapes), 0)
+        self.assertEqual(list(ps.shapes.values()), [current_ball])
+        self.assertTrue(current_ball.active)
+
+        ps.reactivate(self.box)
+
+        self.assertEqual(list(self.other.shapes.values()), [self.box])
+        self.assertEqual(list(ps.shapes.values()), [current_ball])
+
+    def test_tagging_a_shape_indexes_it_in_its_own_world(self):
+        self.box.add_tag('floor')
+
+        self.assertEqual(list(self.other.shapes_by_tag['floor'].values()), [self.box])
+        self.assertEqual(ps.shapes_by_tag, {})
+
+    def test_every_piece_of_world_state_is_a_module_global(self):
+        with open(ps.__file__) as source:
+            declared = {line.split(' = ')[0] for line in source if ' = ' in line and line[0].isalpha()}
+
+        self.assertEqual(set(_new_state()) - declared, set())
+
+
+class TestWorldPickling(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+        self.floor = ps.static_box((0, 100), 200, 20)
+        self.ball = ps.ball((50, 50), 10)
+        self.ball.elasticity = 0.0
+
+        del hits[:]
+        del steps[:]
+
+    def tearDown(self):
+        ps.reset()
+
+    def round_trip(self):
+        copy = pickle.loads(pickle.dumps(self.world))
+
+        copy.activate()
+        ps.run_headless(60)
+
+        return copy
+
+    def test_pair_handler_runs_after_unpickling(self):
+        ps.add_collision(self.ball, self.floor, record_hit)
+        copy = self.round_trip()
+
+        self.assertEqual(len(hits), 1)
+        self.assertIn(hits[0][0], copy.shapes.values())
+        self.assertIsNot(hits[0][0], self.ball)
+
+    def test_category_handler_runs_after_unpickling(self):
+        ps.add_collision('ball', self.floor, record_hit)
+        self.round_trip()
+
+        self.assertEqual(len(hits), 1)
+
+    def test_category_pair_runs_after_unpickling(self):
+        ps.add_collision('ball', 'box', record_hit)
+        self.round_trip()
+
+        self.assertEqual(len(hits), 1)
+
+    def test_observers_run_after_unpickling(self):
+        ps.add_observer(record_step)
+        self.round_trip()
+
+        self.assertEqual(len(steps), 60)
+
+    def test_running_the_copy_leaves_the_original_alone(self):
+        position = self.ball.position
+        self.round_trip()
+
+        self.assertEqual(self.ball.position, position)
+
+
+class TestWorldSwitching(unittest.TestCase):
+
+    def setUp(self):
+        self.world = ps.World()
+        self.world.activate()
+
+    def tearDown(self):
+        ps.reset()
+
+    def test_with_makes_a_world_current_until_the_end(self):
+        other = ps.World()
+
+        with other:
+            self.assertIs(ps.current_world(), other)
+            ps.ball((50, 50), 10)
+
+        self.assertIs(ps.current_world(), self.world)
+        self.assertEqual(ps.num_shapes(), 0)
+        self.assertEqual(len(other.shapes), 1)
+
+    def test_with_restores_the_world_after_an_error(self):
+        with self.assertRaises(ValueError):
+            with ps.World():
+                raise ValueError()
+
+        self.assertIs(ps.current_world(), self.world)
+
+    def test_reset_starts_the_current_world_over(self):
+        ps.ball((50, 50), 10)
+        ps.add_observer(record_step)
+        ps.gravity(0, 100)
+
+        ps.reset()
+
+        self.assertIs(ps.current_world(), self.world)
+        self.assertEqual(ps.num_shapes(), 0)
+        self.assertEqual(ps.observers, [])
+        self.assertEqual(ps.space.gravity, (0.0, 500.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,27 @@
 import pygame
 import pymunk
 import math
+import collections
 
 from .box_shape import Box
 from .base_shape import BaseShape
+from .font_cache import get_font
+from .font_cache import text_size
+from .font_cache import render_label
 
 
 class Text(Box):
+    # Rotating text is slow, so rotated labels are kept for
+    # reuse, with angles rounded to the nearest rotation_step
+    rotation_step = 1
+    rotation_cache_size = 32
+
     def __init__(self, space, x, y, caption, font_name, font_size, mass, static, cosmetic=False):
-        self.font = pygame.font.SysFont(font_name, font_size)
-        width, height = self.font.size(caption)
-        height -= self.font.get_ascent()
+        self._rotations = collections.OrderedDict()
+        self.font_name = font_name
+        self.font_size = font_size
+        self.font = get_font(font_name, font_size)
+        width, height = text_size(font_name, font_size, caption)
 
         self.caption = caption
         self.space = space
@@ -23,14 +34,44 @@ class Text(Box):
 
         super().__init__(space, box_x, box_y, width, height, 3, mass, static, cosmetic)
 
-        self.label = self.font.render(self.caption, True, self.color)
+        self.label = render_label(self.font_name, self.font_size, self.caption, self.color)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['font']
+        del state['label']
+        state['_rotations'] = collections.OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.font = get_font(self.font_name, self.font_size)
+        self.label = render_label(self.font_name, self.font_size, self.caption, self.color)
 
-    def _draw(self, screen):
-        degrees = self.angle
-        rotated = pygame.transform.rotate(self.label, degrees)
+    def _draw(self, screen, poses=None):
+        position, angle = self._pose(poses)
+        degrees = round(-math.degrees(angle) / Text.rotation_step) * Text.rotation_step % 360
+        rotated = self._rotations.get(degrees)
+
+        if rotated is None:
+            rotated = pygame.transform.rotate(self.label, degrees)
+            self._rotations[degrees] = rotated
+
+            while len(self._rotations) > Text.rotation_cache_size:
+                self._rotations.popitem(last=False)
+        else:
+            self._rotations.move_to_end(degrees)
 
         size = rotated.get_rect()
-        screen.blit(rotated, (self.position.x-(size.width/2), self.position.y-(size.height/2)))
+        return screen.blit(rotated, (position.x-(size.width/2), position.y-(size.height/2)))
+
+    def _inside(self, p):
+        width, height = self.label.get_size()
+
+        return abs(p[0] - self._x) <= width / 2 and abs(p[1] - self._y) <= height / 2
+
+    def _sprite(self, cache, poses=None):
+        return None
 
     def __repr__(self):
         prefix = 'box'
@@ -47,7 +88,8 @@ class Text(Box):
     @BaseShape.color.setter
     def color(self, value):
         BaseShape.color.fset(self, value)
-        self.label = self.font.render(self.caption, True, self.color)
+        self.label = render_label(self.font_name, self.font_size, self.caption, self.color)
+        self._rotations.clear()
 
     @property
     def text(self):
@@ -57,11 +99,12 @@ class Text(Box):
     def text(self, value):
         if type(value) == str:
             self.caption = value
-            self.label = self.font.render(self.caption, True, self.color)
+            self.label = render_label(self.font_name, self.font_size, self.caption, self.color)
+            self._rotations.clear()
+            self._redraw_background()
 
             if not self._cosmetic:
-                width, height = self.font.size(value)
-                height -= self.font.get_ascent()
+                width, height = text_size(self.font_name, self.font_size, value)
 
                 moment = pymunk.moment_for_box(self.body.mass, (width, height))
 
@@ -72,6 +115,8 @@ class Text(Box):
 
                 body.position = self.position
                 shape = pymunk.Poly.create_box(body, (width, height), self.radius)
+                shape.collision_type = self.shape.collision_type
+                shape.filter = self.shape.filter
                 self.width = width
                 self.height = height
 
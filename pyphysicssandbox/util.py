@@ -35,3 +35,21 @@ def poly_area(vertices):
         a += abs(vertices[i][0] * vertices[j][1] - vertices[j][0] * vertices[i][1])
     result = a / 2.0
     return result
+
+
+def point_in_polygon(p, vertices):
+    # Counts how many edges a ray to the right of p crosses
+    x, y = p
+    inside = False
+    j = len(vertices) - 1
+
+    for i in range(len(vertices)):
+        xi, yi = vertices[i]
+        xj, yj = vertices[j]
+
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+
+        j = i
+
+    return inside
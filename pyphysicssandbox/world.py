@@ -0,0 +1,194 @@
+import pymunk
+
+from pygame import Color
+
+from .profiler import Profiler
+
+
+class World:
+    # Everything about one simulation: the physics space, the shapes, the
+    # observers, the window and timing settings, and the caches used for
+    # drawing.  The sandbox functions work on the current world, whose
+    # state is kept in the pyphysicssandbox module globals while it's
+    # current.  Other worlds keep their state here until they're made
+    # current, so any number of simulations can be set up in one program.
+    def __init__(self):
+        self._state = _new_state()
+
+    def __getattr__(self, name):
+        # Only called for names that aren't normal attributes
+        state = self.__dict__.get('_state')
+
+        if state is None or name not in state:
+            raise AttributeError(name)
+
+        if self.is_current():
+            return getattr(_sandbox(), name)
+
+        return state[name]
+
+    def __setattr__(self, name, value):
+        if name != '_state' and name in self._state:
+            if self.is_current():
+                setattr(_sandbox(), name, value)
+            else:
+                self._state[name] = value
+        else:
+            super().__setattr__(name, value)
+
+    def __enter__(self):
+        self._previous = _sandbox().current_world()
+        self.activate()
+        return self
+
+    def __exit__(self, *exc_info):
+        previous = self.__dict__.pop('_previous')
+        previous.activate()
+
+    def __repr__(self):
+        return 'world: ' + str(len(self.shapes)) + ' shapes'
+
+    def is_current(self):
+        return _sandbox()._world is self
+
+    def activate(self):
+        # Makes this the world the sandbox functions work on
+        sandbox = _sandbox()
+        current = sandbox._world
+
+        if current is self:
+            return
+
+        if current is not None:
+            current._save()
+
+        self._install()
+
+    def reset(self):
+        # Starts this world over with no shapes and default settings
+        self._state = _new_state()
+
+        if self.is_current():
+            self._install()
+
+    def _save(self):
+        sandbox = _sandbox()
+
+        for name in self._state:
+            self._state[name] = getattr(sandbox, name)
+
+    def _install(self):
+        sandbox = _sandbox()
+
+        for name, value in self._state.items():
+            setattr(sandbox, name, value)
+
+        sandbox._world = self
+
+    def __getstate__(self):
+        if self.is_current():
+            self._save()
+
+        state = dict(self._state)
+
+        # The window's drawing state is rebuilt after unpickling
+        state['background'] = None
+        state['drawn_rects'] = None
+
+        # pymunk pickles collision handlers along with the space, but
+        # not the handler objects it hands out
+        state['category_handler'] = state['category_handler'] is not None
+
+        return state
+
+    def __setstate__(self, state):
+        fresh = _new_state()
+        fresh.update(state)
+
+        if fresh['category_handler']:
+            fresh['category_handler'] = fresh['space'].add_default_collision_handler()
+        else:
+            fresh['category_handler'] = None
+
+        for collision_type1, collision_type2, handler in fresh['collision_handlers']:
+            _sandbox()._install_collision_handler(fresh['space'], collision_type1, collision_type2, handler)
+
+        self._state = fresh
+
+
+def _new_state():
+    space = pymunk.Space()
+    space.gravity = (0.0, 500.0)
+    space.damping = 0.95
+
+    return {
+        'space': space,
+        'next_collision_type': 0,
+
+        'win_title': "Untitled",
+        'win_width': 500,
+        'win_height': 500,
+        'x_margin': 500,
+        'y_margin': 500,
+        'observers': [],
+        'key_observers': {},
+        'observer_step': 0,
+        'last_observer_calls': 0,
+        'clicked': False,
+        'default_color': Color('black'),
+
+        'physics_dt': 1 / 50.0,
+        'physics_substeps': 1,
+        'frame_rate': 50,
+        'interpolate': False,
+        'max_frame_time': 0.25,
+        'load_shedding': True,
+        'max_skipped_frames': 10,
+        'scheduler': None,
+        'profiler': Profiler(),
+        'profile_overlay': False,
+
+        'cull_interval': 1,
+        'cull_hysteresis': 1,
+        'cull_countdown': 0,
+
+        'shapes': {},
+        'unqueried_shapes': {},
+        'wrapping_shapes': {},
+        'background_shapes': {},
+        'foreground_shapes': {},
+        'background': None,
+        'dirty_rects': False,
+        'sprite_cache': None,
+        'drawn_rects': None,
+        'out_of_bounds': {},
+        'previous_state': {},
+        'shapes_version': 0,
+        'shapes_by_kind': {},
+        'shapes_by_mobility': {},
+        'shapes_by_group': {},
+        'shapes_by_tag': {},
+        'shape_categories': {},
+        'category_pairs': [],
+        'category_handler': None,
+        'collision_handlers': [],
+        'collision_recorder': None,
+        'broadphase_tuner': None,
+        'state_snapshot': None,
+    }
+
+
+_package = None
+
+
+def _sandbox():
+    # The package is imported here rather than at the top, since it
+    # imports this module while it's being set up.  It's only looked up
+    # once, since worlds use it for every attribute.
+    global _package
+
+    if _package is None:
+        import pyphysicssandbox
+        _package = pyphysicssandbox
+
+    return _package